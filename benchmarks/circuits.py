@@ -0,0 +1,71 @@
+import numpy as np
+
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import QFTGate, efficient_su2
+from qiskit.circuit.random import random_circuit
+
+
+def ghz(num_qubits, seed = None):
+    """
+    GHZ state preparation
+    """
+    qc = QuantumCircuit(num_qubits)
+    qc.h(0)
+    for qubit in range(num_qubits - 1):
+        qc.cx(qubit, qubit + 1)
+    qc.measure_all()
+    return qc
+
+
+def qft(num_qubits, seed = None):
+    """
+    QFT applied to the uniform superposition
+    """
+    qc = QuantumCircuit(num_qubits)
+    qc.h(range(num_qubits))
+    qc.append(QFTGate(num_qubits), range(num_qubits))
+    qc.measure_all()
+    return qc
+
+
+def random(num_qubits, seed = None):
+    """
+    Random circuit with one- and two-qubit gates, depth equal to the width
+    """
+    return random_circuit(num_qubits, depth=num_qubits, max_operands=2,
+                          measure=True, seed=seed)
+
+
+def ansatz(num_qubits, seed = None, bind = True):
+    """
+    EfficientSU2 variational ansatz
+
+    :param bind: bind random parameter values (otherwise left parameterized)
+    """
+    qc = efficient_su2(num_qubits, reps=2)
+    if bind:
+        rng = np.random.default_rng(seed)
+        qc = qc.assign_parameters(rng.uniform(0, 2 * np.pi, qc.num_parameters))
+    qc.measure_all()
+    return qc
+
+
+FAMILIES = {
+    "ghz": ghz,
+    "qft": qft,
+    "random": random,
+    "ansatz": ansatz,
+}
+
+
+def build(family, num_qubits, seed = None):
+    """
+    Build a benchmark circuit
+
+    :param family: one of FAMILIES
+    :param num_qubits: width of the circuit
+    :param seed: seed for random families
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown circuit family {family}, choose from {sorted(FAMILIES)}")
+    return FAMILIES[family](num_qubits, seed=seed)
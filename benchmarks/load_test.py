@@ -0,0 +1,304 @@
+"""
+End-to-end load and latency benchmark
+
+Runs the transpiler service (over HTTP), the simulator job flow and
+RemoteAerBackend in one process against local stand-ins: fakeredis (or a
+local redis-server) and a fake CustomObjectsApi that runs simulator jobs
+in a thread pool. Circuits are submitted at a target arrival rate and the
+throughput and p50/p95/p99 latency of every stage is reported as JSON.
+
+    python -m benchmarks.load_test --families ghz,qft --qubits 4,8 \\
+        --rate 2 --duration 30 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.circuits import FAMILIES, ansatz, build
+from benchmarks.stand_ins import FakeCustomObjectsApi, install_stand_ins
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# run in a fresh interpreter, as in a newly started simulator pod
+COLD_START_CODE = """
+import json, time
+start = time.perf_counter()
+import simulator
+from utils.startup import profiler
+report = profiler.report(top=10)
+report["module_import_s"] = round(time.perf_counter() - start, 6)
+print(json.dumps(report))
+"""
+
+
+def percentiles(samples):
+    """
+    Summary statistics of a list of latencies (seconds)
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def quantile(q):
+        # linear interpolation between closest ranks
+        pos = q * (len(ordered) - 1)
+        low = int(pos)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(quantile(0.50), 6),
+        "p95": round(quantile(0.95), 6),
+        "p99": round(quantile(0.99), 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+def start_services(args):
+    """
+    Install the stand-ins, import the services and serve the transpiler app
+
+    :return: (fake api, span exporter, http server, RemoteAerBackend class,
+        in-process import seconds of the services)
+    """
+    api = FakeCustomObjectsApi(sim_workers=args.sim_workers, pod_startup=args.pod_startup)
+
+    if args.redis:
+        host, _, port = args.redis.partition(":")
+        os.environ["REDIS_HOST"], os.environ["REDIS_PORT"] = host, port or "6379"
+        install_stand_ins(api)
+    else:
+        import fakeredis
+        os.environ.setdefault("REDIS_HOST", "localhost")
+        os.environ.setdefault("REDIS_PORT", "6379")
+        install_stand_ins(api, redis_server=fakeredis.FakeServer())
+
+    for path in ("transpiler-service", "simulator", ""):
+        sys.path.insert(0, os.path.join(REPO_ROOT, path))
+    os.environ.pop("IBM_API_KEY", None)
+
+    # qiskit is already loaded by the benchmark, these are the service-specific imports
+    import_seconds = {}
+    start = time.perf_counter()
+    import transpiler_service
+    import_seconds["transpiler_service"] = round(time.perf_counter() - start, 6)
+    start = time.perf_counter()
+    import simulator
+    import_seconds["simulator"] = round(time.perf_counter() - start, 6)
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from werkzeug.serving import make_server
+
+    api.simulator = simulator
+
+    # every stage is a span, collect them to compute per-stage latencies
+    exporter = InMemorySpanExporter()
+    trace.get_tracer_provider().add_span_processor(SimpleSpanProcessor(exporter))
+
+    server = make_server("127.0.0.1", 0, transpiler_service.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["TRANSPILER_SERVICE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["JOB_POLL_INTERVAL"] = str(args.poll_interval)
+    # benchmark circuits are small enough to run in-process, measure the service
+    os.environ["REMOTE_AER_FORCE_REMOTE"] = "1"
+    from remote_aer_backend import RemoteAerBackend
+
+    return api, exporter, server, RemoteAerBackend, import_seconds
+
+
+def measure_cold_start(runs):
+    """
+    Cold start of the simulator: a fresh interpreter importing simulator.py
+    with the startup profiler on, as a newly scheduled pod does
+
+    :param runs: number of fresh interpreters
+    :return: process and module import latencies, and the profile of the last run
+    """
+    env = dict(os.environ, STARTUP_PROFILE="1",
+               PYTHONPATH=os.pathsep.join([REPO_ROOT, os.path.join(REPO_ROOT, "simulator")]))
+    process_s, import_s, profile = [], [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", COLD_START_CODE], env=env,
+                                   capture_output=True, text=True)
+        process_s.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            return {"error": completed.stderr.strip().splitlines()[-1:]}
+        profile = json.loads(completed.stdout.strip().splitlines()[-1])
+        import_s.append(profile.pop("module_import_s"))
+    return {
+        "process": percentiles(process_s),
+        "module_import": percentiles(import_s),
+        "profile": profile,
+    }
+
+
+def run_one(backend, family, num_qubits, shots, seed, sweep_points = 0):
+    """
+    Submit one circuit and wait for its result
+
+    :param sweep_points: submit ansatz circuits as one parameterized PUB with
+        this many parameter sets (0 submits bound circuits)
+    :return: record with submit and end-to-end latency
+    """
+    if family == "ansatz" and sweep_points:
+        circuit = ansatz(num_qubits, bind=False)
+        values = np.random.default_rng(seed).uniform(0, 2 * np.pi, (sweep_points, circuit.num_parameters))
+        circuit = (circuit, values)
+    else:
+        circuit = build(family, num_qubits, seed=seed)
+    record = {"family": family, "num_qubits": num_qubits, "ok": False}
+    start = time.perf_counter()
+    try:
+        job = backend.run(circuit, shots=shots)
+        record["submit"] = time.perf_counter() - start
+        job.result()
+        record["end_to_end"] = time.perf_counter() - start
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def stage_latencies(spans):
+    """
+    Group finished spans by name, durations in seconds
+    """
+    stages = defaultdict(list)
+    for finished in spans:
+        stages[finished.name].append((finished.end_time - finished.start_time) / 1e9)
+    return {name: percentiles(samples) for name, samples in sorted(stages.items())}
+
+
+def run_benchmark(args):
+    """
+    Replay the workload at the target arrival rate and summarize it
+    """
+    cold_start = measure_cold_start(args.cold_start_runs) if args.cold_start_runs else {}
+    api, exporter, server, RemoteAerBackend, import_seconds = start_services(args)
+    backend = RemoteAerBackend(name="aer-simulator")
+    cold_start["in_process_import_seconds"] = import_seconds
+
+    workload = [(family, n) for family in args.families for n in args.qubits]
+    rng = random.Random(args.seed)
+
+    # warm-up: first transpile / simulation pay one-off import and setup costs
+    warmup = [run_one(backend, family, n, args.shots, args.seed, args.sweep_points)
+              for family, n in workload[:args.warmup]]
+    if warmup and warmup[0]["ok"]:
+        cold_start["first_job_s"] = round(warmup[0]["end_to_end"], 6)
+    exporter.clear()
+
+    total_jobs = max(int(args.rate * args.duration), 1)
+    futures = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        next_arrival = start
+        for i in range(total_jobs):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            family, n = workload[i % len(workload)]
+            futures.append(pool.submit(run_one, backend, family, n, args.shots, args.seed + i,
+                                       args.sweep_points))
+            interarrival = rng.expovariate(args.rate) if args.poisson else 1 / args.rate
+            next_arrival += interarrival
+        records = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    api.shutdown()
+
+    completed = [r for r in records if r["ok"]]
+    by_workload = defaultdict(list)
+    for r in completed:
+        by_workload[f"{r['family']}-{r['num_qubits']}"].append(r["end_to_end"])
+
+    return {
+        "config": {
+            "families": args.families,
+            "qubits": args.qubits,
+            "shots": args.shots,
+            "sweep_points": args.sweep_points,
+            "rate": args.rate,
+            "duration": args.duration,
+            "poisson": args.poisson,
+            "clients": args.clients,
+            "sim_workers": args.sim_workers,
+            "pod_startup": args.pod_startup,
+            "redis": args.redis or "fakeredis",
+        },
+        "jobs": {
+            "submitted": len(records),
+            "completed": len(completed),
+            "failed": len(records) - len(completed),
+            "errors": sorted({r["error"] for r in records if not r["ok"]})[:10],
+        },
+        "wall_seconds": round(elapsed, 3),
+        "throughput_jobs_per_s": round(len(completed) / elapsed, 3),
+        "latency": {
+            "submit": percentiles([r["submit"] for r in completed]),
+            "end_to_end": percentiles([r["end_to_end"] for r in completed]),
+        },
+        "end_to_end_by_workload": {k: percentiles(v) for k, v in sorted(by_workload.items())},
+        "stages": stage_latencies(exporter.get_finished_spans()),
+        "cold_start": cold_start,
+    }
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", default="ghz,qft,random,ansatz",
+                        type=lambda s: s.split(","),
+                        help=f"comma separated circuit families {sorted(FAMILIES)}")
+    parser.add_argument("--qubits", default="4,8", type=lambda s: [int(n) for n in s.split(",")],
+                        help="comma separated circuit widths")
+    parser.add_argument("--shots", type=int, default=1024)
+    parser.add_argument("--sweep-points", type=int, default=0,
+                        help="run ansatz circuits as parameter sweeps of this many points")
+    parser.add_argument("--rate", type=float, default=1.0, help="target arrival rate (jobs/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="submission window (s)")
+    parser.add_argument("--poisson", action="store_true", help="exponential interarrival times")
+    parser.add_argument("--clients", type=int, default=16, help="max concurrent client jobs")
+    parser.add_argument("--sim-workers", type=int, default=2, help="simulator jobs run concurrently")
+    parser.add_argument("--pod-startup", type=float, default=0.0, help="emulated pod start delay (s)")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="client polling interval (s)")
+    parser.add_argument("--warmup", type=int, default=1, help="warm-up jobs, excluded from results")
+    parser.add_argument("--cold-start-runs", type=int, default=3,
+                        help="fresh interpreters importing the simulator (0 disables)")
+    parser.add_argument("--redis", default=None, help="host:port of a local redis-server (default fakeredis)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    parser.add_argument("--quiet", action="store_true", help="silence service logs")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull) if args.quiet else contextlib.nullcontext():
+            report = run_benchmark(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Serialization microbenchmarks and regression gate
+
+Measures time and peak memory of every codec step of the payload pipeline
+(QPY dump/load, base64, the JSON job record, its compression in redis and
+RuntimeEncoder / RuntimeDecoder for results), from small to very large circuits and results.
+
+Timings only compare on the same machine: record the baseline on the base
+commit, then run the gate on the change, back to back.
+
+    # on the base commit
+    python -m benchmarks.serialization --save-baseline /tmp/serialization-baseline.json
+
+    # on the change: fail (exit code 1) when a step regresses by more than 25%
+    python -m benchmarks.serialization --baseline /tmp/serialization-baseline.json --threshold 0.25
+
+The gate exits with code 2 when the baseline file is missing, it never passes
+without comparing against one.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from qiskit import QuantumCircuit, qpy
+from qiskit.circuit.random import random_circuit
+from qiskit_aer import AerSimulator
+from qiskit_ibm_runtime import SamplerV2
+from qiskit_ibm_runtime.utils import RuntimeEncoder, RuntimeDecoder
+
+from utils.redisDB import compress_value, decompress_value
+
+# (num_qubits, depth) of the random circuits
+CIRCUIT_SIZES = {
+    "small": (4, 10),
+    "medium": (16, 100),
+    "large": (32, 500),
+    "xlarge": (64, 2000),
+}
+
+# shots of the sampled results (20 classical bits)
+RESULT_SHOTS = {
+    "small": 1_000,
+    "medium": 10_000,
+    "large": 100_000,
+    "xlarge": 1_000_000,
+}
+RESULT_WIDTH = 20
+
+
+def qpy_dump(circuits):
+    with io.BytesIO() as fptr:
+        qpy.dump(circuits, fptr)
+        return fptr.getvalue()
+
+
+def qpy_load(circuit_bytes):
+    with io.BytesIO(circuit_bytes) as fptr:
+        return qpy.load(fptr)
+
+
+def b64_encode(payload):
+    return base64.b64encode(payload).decode("utf-8")
+
+
+def b64_decode(payload_b64):
+    return base64.b64decode(payload_b64)
+
+
+def record_encode(payload_b64):
+    # job record as written by RedisDB, one JSON document per job
+    return json.dumps({"payload": payload_b64, "created_at": "", "updated_at": ""}).encode("utf-8")
+
+
+def record_decode(record):
+    return json.loads(record.decode("utf-8"))["payload"]
+
+
+def runtime_encode(results):
+    return json.dumps(results, cls=RuntimeEncoder).encode("utf-8")
+
+
+def runtime_decode(result_bytes):
+    return json.loads(result_bytes.decode("utf-8"), cls=RuntimeDecoder)
+
+
+# each pipeline is a chain: the output of a step is the input of the next
+CIRCUIT_PIPELINE = [
+    ("qpy_dump", qpy_dump),
+    ("b64_encode", b64_encode),
+    ("record_encode", record_encode),
+    ("redis_compress", compress_value),
+    ("redis_decompress", decompress_value),
+    ("record_decode", record_decode),
+    ("b64_decode", b64_decode),
+    ("qpy_load", qpy_load),
+]
+
+RESULT_PIPELINE = [
+    ("runtime_encode", runtime_encode),
+    ("b64_encode", b64_encode),
+    ("record_encode", record_encode),
+    ("redis_compress", compress_value),
+    ("redis_decompress", decompress_value),
+    ("record_decode", record_decode),
+    ("b64_decode", b64_decode),
+    ("runtime_decode", runtime_decode),
+]
+
+
+def build_circuits(size):
+    num_qubits, depth = CIRCUIT_SIZES[size]
+    return [random_circuit(num_qubits, depth=depth, max_operands=2, measure=True, seed=7)]
+
+
+def build_results(size):
+    qc = QuantumCircuit(RESULT_WIDTH)
+    qc.h(range(RESULT_WIDTH))
+    qc.measure_all()
+    sampler = SamplerV2(mode=AerSimulator(seed_simulator=7))
+    return sampler.run([qc], shots=RESULT_SHOTS[size]).result()
+
+
+def payload_size(payload):
+    try:
+        return len(payload)
+    except TypeError:
+        return None
+
+
+def measure(step, payload, repeat):
+    """
+    Time a codec step and measure its peak traced memory
+
+    :param step: callable taking the payload
+    :param payload: input of the step
+    :param repeat: number of timed runs
+    :return: (stats dict, output of the step)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = step(payload)
+        times.append(time.perf_counter() - start)
+
+    # separate run, tracemalloc slows the step down
+    tracemalloc.start()
+    step(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": round(statistics.median(times), 6),
+        "min_s": round(min(times), 6),
+        "peak_kib": round(peak / 1024, 1),
+        "bytes_out": payload_size(output),
+    }, output
+
+
+def run_pipeline(name, pipeline, payload, size, repeat, report):
+    for step_name, step in pipeline:
+        stats, payload = measure(step, payload, repeat)
+        report[f"{name}/{size}/{step_name}"] = stats
+        print(f"{name:8s} {size:7s} {step_name:15s} {stats['median_s']*1e3:10.3f} ms "
+              f"{stats['peak_kib']:12.1f} KiB", file=sys.stderr)
+
+
+def run_benchmarks(sizes, repeat):
+    report = {}
+    for size in sizes:
+        run_pipeline("circuit", CIRCUIT_PIPELINE, build_circuits(size), size, repeat, report)
+        run_pipeline("result", RESULT_PIPELINE, build_results(size), size, repeat, report)
+    return report
+
+
+def find_regressions(current, baseline, threshold, min_seconds):
+    """
+    Compare a report with a baseline
+
+    :param threshold: allowed relative slowdown / memory growth (0.25 = 25%)
+    :param min_seconds: timings below this are treated as noise
+    :return: list of human readable regressions
+    """
+    regressions = []
+    for key, stats in sorted(current.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        allowed = max(base["median_s"], min_seconds) * (1 + threshold)
+        if stats["median_s"] > allowed:
+            regressions.append(f"{key}: time {base['median_s']:.6f}s -> {stats['median_s']:.6f}s")
+        if stats["peak_kib"] > base["peak_kib"] * (1 + threshold) + 64:
+            regressions.append(f"{key}: peak memory {base['peak_kib']} KiB -> {stats['peak_kib']} KiB")
+    return regressions
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="small,medium,large", type=lambda s: s.split(","),
+                        help=f"comma separated sizes {list(CIRCUIT_SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per step")
+    parser.add_argument("--baseline", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", default=None, help="write the report as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-seconds", type=float, default=0.001,
+                        help="timings below this are not gated")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"❌ Baseline {args.baseline} not found, record one with --save-baseline",
+              file=sys.stderr)
+        sys.exit(2)
+    report = run_benchmarks(args.sizes, args.repeat)
+    output = json.dumps(report, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            f.write(output)
+        print(f"Saved baseline to {args.save_baseline}", file=sys.stderr)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print("❌ Serialization regressions:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ No serialization regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
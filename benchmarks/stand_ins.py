@@ -0,0 +1,127 @@
+import copy
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import kubernetes
+import redis
+from kubernetes.client.exceptions import ApiException
+
+
+def _timestamp(epoch = None):
+    """
+    RFC3339 timestamp as written by the API server
+    """
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+class FakeCustomObjectsApi:
+    """
+    In-memory stand-in for kubernetes CustomObjectsApi.
+
+    A created QuantumAerJob is "run" by executing the simulator job flow
+    in a thread pool, which plays the role of the operator and the
+    simulator pods. The pool size is the number of pods the fake cluster
+    can run at once.
+    """
+
+    def __init__(self, sim_workers = 2, pod_startup = 0.0):
+        """
+        :param sim_workers: number of simulator jobs running concurrently
+        :param pod_startup: emulated scheduling + container start delay (seconds)
+        """
+        self.simulator = None
+        self.pod_startup = pod_startup
+        self._objects = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=sim_workers,
+                                        thread_name_prefix="fake-pod")
+
+    def create_namespaced_custom_object(self, group, version, namespace, plural, body):
+        name = body["metadata"]["name"]
+        obj = copy.deepcopy(body)
+        obj["metadata"]["creationTimestamp"] = _timestamp()
+        obj["status"] = {"jobStatus": "pending", "startTime": _timestamp(), "retries": 0}
+        with self._lock:
+            if (namespace, name) in self._objects:
+                raise ApiException(status=409, reason="AlreadyExists")
+            self._objects[(namespace, name)] = obj
+        self._pool.submit(self._run_pod, namespace, name)
+        return copy.deepcopy(obj)
+
+    def get_namespaced_custom_object(self, group, version, namespace, plural, name):
+        with self._lock:
+            if (namespace, name) not in self._objects:
+                raise ApiException(status=404, reason="NotFound")
+            return copy.deepcopy(self._objects[(namespace, name)])
+
+    def list_namespaced_custom_object(self, group, version, namespace, plural,
+                                      label_selector = None):
+        with self._lock:
+            items = [copy.deepcopy(obj) for (ns, _), obj in self._objects.items()
+                     if ns == namespace]
+        return {"items": items}
+
+    def patch_namespaced_custom_object_status(self, group, version, namespace, plural,
+                                              name, body):
+        with self._lock:
+            self._objects[(namespace, name)]["status"].update(body.get("status", {}))
+
+    def delete_namespaced_custom_object(self, group, version, namespace, plural, name):
+        with self._lock:
+            self._objects.pop((namespace, name), None)
+
+    def _set_status(self, namespace, name, **status):
+        with self._lock:
+            self._objects[(namespace, name)]["status"].update(status)
+
+    def _run_pod(self, namespace, name):
+        """
+        Emulate the operator creating a simulator pod for the CR
+        """
+        from utils.tracing import span
+
+        time.sleep(self.pod_startup)
+        spec = self.get_namespaced_custom_object(None, None, namespace, None, name)["spec"]
+        self._set_status(namespace, name, jobStatus="in progress",
+                         podName=f"{name}-sim-0", podCreatedTime=_timestamp())
+
+        config_vars = self.simulator.get_env_vars()
+        config_vars.update({
+            "shots": spec["shots"],
+            "backend_name": spec["backendName"],
+            "job_id": spec["jobID"],
+            "quantum_job_name": name,
+            "quantum_job_namespace": namespace,
+            "traceparent": spec.get("traceParent"),
+        })
+        timings = {}
+        try:
+            with span("simulator.job", traceparent=config_vars["traceparent"],
+                      job_id=config_vars["job_id"]):
+                self.simulator.run_job(config_vars, timings)
+            self._set_status(namespace, name, jobStatus="completed",
+                             completionTime=_timestamp())
+        except Exception as e:
+            self._set_status(namespace, name, jobStatus="failed",
+                             errorMessage=str(e)[:1000], completionTime=_timestamp())
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def install_stand_ins(api, redis_server = None):
+    """
+    Route the kubernetes client and (optionally) redis to local stand-ins.
+    Must run before the services are imported.
+
+    :param api: FakeCustomObjectsApi returned by client.CustomObjectsApi()
+    :param redis_server: fakeredis.FakeServer, or None to use a real redis-server
+    """
+    kubernetes.config.load_incluster_config = lambda: None
+    kubernetes.client.CustomObjectsApi = lambda *args, **kwargs: api
+
+    if redis_server is not None:
+        import fakeredis
+        redis.Redis = functools.partial(fakeredis.FakeRedis, server=redis_server)
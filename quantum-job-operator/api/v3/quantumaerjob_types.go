@@ -64,6 +64,11 @@ type QuantumAerJobSpec struct {
 	// Resources defines the compute resources required for the simulator pod
 	// +optional
 	Resources ResourceRequirements `json:"resources,omitempty"`
+
+	// TraceParent is the W3C trace context of the request that created the job.
+	// It is passed to the simulator pod so that its spans join the same trace.
+	// +optional
+	TraceParent string `json:"traceParent,omitempty"`
 	
 }
 
@@ -125,6 +130,10 @@ type QuantumAerJobStatus struct {
 	// PodName is the name of the simulator pod
 	// +optional
 	PodName string `json:"podName,omitempty"`
+
+	// PodCreatedTime is when the current simulator pod was created
+	// +optional
+	PodCreatedTime *metav1.Time `json:"podCreatedTime,omitempty"`
 	
 	// StartTime is when the job started executing
 	// +optional
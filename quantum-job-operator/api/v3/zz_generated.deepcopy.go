@@ -115,6 +115,10 @@ func (in *QuantumAerJobStatus) DeepCopyInto(out *QuantumAerJobStatus) {
 			(*in)[i].DeepCopyInto(&(*out)[i])
 		}
 	}
+	if in.PodCreatedTime != nil {
+		in, out := &in.PodCreatedTime, &out.PodCreatedTime
+		*out = (*in).DeepCopy()
+	}
 	if in.StartTime != nil {
 		in, out := &in.StartTime, &out.StartTime
 		*out = (*in).DeepCopy()
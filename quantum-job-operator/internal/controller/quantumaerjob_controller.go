@@ -159,6 +159,9 @@ func (r* QuantumAerJobReconciler) createSimulatorPod(ctx context.Context, job *a
     //     return err
 	// }
 
+	// optional config, pods still start if the configmap is absent
+	optional := true
+
 	envVar := []v1.EnvVar{
 		{Name: "JOB_ID" , Value: job.Spec.JobID},
 		{Name: "BACKEND_NAME", Value: job.Spec.BackendName},
@@ -166,6 +169,7 @@ func (r* QuantumAerJobReconciler) createSimulatorPod(ctx context.Context, job *a
 		{Name: "SIMULATOR_IMAGE", Value: job.Spec.SimulatorImage},
 		{Name: "QUANTUM_JOB_NAME", Value: job.Name},
 		{Name: "QUANTUM_JOB_NAMESPACE",Value: job.Namespace},
+		{Name: "TRACEPARENT", Value: job.Spec.TraceParent},
 		{Name: "IBM_API_KEY", ValueFrom: &v1.EnvVarSource{
 			SecretKeyRef: &v1.SecretKeySelector{
 				LocalObjectReference: v1.LocalObjectReference{
@@ -202,6 +206,26 @@ func (r* QuantumAerJobReconciler) createSimulatorPod(ctx context.Context, job *a
 				},
 			},
 		},
+		{Name: "PUSHGATEWAY_URL", ValueFrom: &v1.EnvVarSource{
+			ConfigMapKeyRef: &v1.ConfigMapKeySelector{
+				LocalObjectReference: v1.LocalObjectReference{
+					Name: "metrics-config",
+					},
+					Key : "pushgateway-url",
+					Optional: &optional,
+				},
+			},
+		},
+		{Name: "OTEL_EXPORTER_OTLP_ENDPOINT", ValueFrom: &v1.EnvVarSource{
+			ConfigMapKeyRef: &v1.ConfigMapKeySelector{
+				LocalObjectReference: v1.LocalObjectReference{
+					Name: "metrics-config",
+					},
+					Key : "otlp-endpoint",
+					Optional: &optional,
+				},
+			},
+		},
 	}
 
 
@@ -223,16 +247,7 @@ func (r* QuantumAerJobReconciler) createSimulatorPod(ctx context.Context, job *a
 				Name : "aer-simulator",
 				Image : job.Spec.SimulatorImage,
 				Env : envVar,
-				Resources: v1.ResourceRequirements{
-					Requests: v1.ResourceList{
-						v1.ResourceCPU: resource.MustParse("1"),
-						v1.ResourceMemory: resource.MustParse("512Mi"),
-						},
-					Limits: v1.ResourceList{
-						v1.ResourceCPU: resource.MustParse("2"),
-						v1.ResourceMemory: resource.MustParse("2Gi"),
-						},
-					},
+				Resources: podResources(ctx, job),
 				},	
 			},
 		},
@@ -259,11 +274,56 @@ func (r* QuantumAerJobReconciler) createSimulatorPod(ctx context.Context, job *a
     
 	if job.Status.PodName != podName{
 		job.Status.PodName = podName
+		// recorded for tracing the pod scheduling delay
+		now := metav1.Now()
+		job.Status.PodCreatedTime = &now
 		return  r.Status().Update(ctx, job)
 	}
 	return nil
 }
 
+// quantity parses a resource quantity, falling back to the default if it is unset or invalid
+func quantity(ctx context.Context, value string, fallback string) resource.Quantity {
+	if value == "" {
+		return resource.MustParse(fallback)
+	}
+	q, err := resource.ParseQuantity(value)
+	if err != nil {
+		logf.FromContext(ctx).Info("Invalid resource quantity, using default", "value", value, "default", fallback)
+		return resource.MustParse(fallback)
+	}
+	return q
+}
+
+// atLeast raises a limit to its request, a limit below the request fails pod validation
+func atLeast(limit resource.Quantity, request resource.Quantity) resource.Quantity {
+	if limit.Cmp(request) < 0 {
+		return request
+	}
+	return limit
+}
+
+// podResources returns the simulator container resources from spec.resources
+// (sized by the transpiler service), with defaults for unset values
+func podResources(ctx context.Context, job *aerjob.QuantumAerJob) v1.ResourceRequirements {
+	requests := job.Spec.Resources.Requests
+	limits := job.Spec.Resources.Limits
+
+	cpuRequest := quantity(ctx, requests.CPU, "1")
+	memoryRequest := quantity(ctx, requests.Memory, "512Mi")
+
+	return v1.ResourceRequirements{
+		Requests: v1.ResourceList{
+			v1.ResourceCPU: cpuRequest,
+			v1.ResourceMemory: memoryRequest,
+			},
+		Limits: v1.ResourceList{
+			v1.ResourceCPU: atLeast(quantity(ctx, limits.CPU, "2"), cpuRequest),
+			v1.ResourceMemory: atLeast(quantity(ctx, limits.Memory, "2Gi"), memoryRequest),
+			},
+	}
+}
+
 func (r* QuantumAerJobReconciler) getForPod(ctx context.Context, job *aerjob.QuantumAerJob) (*v1.Pod, error) {
     log := logf.FromContext(ctx)
     
@@ -1,5 +1,6 @@
 from flask import jsonify, request
 import requests
+from urllib3.exceptions import NewConnectionError
 import base64
 import io
 import os
@@ -9,24 +10,36 @@ import time
 import traceback
 from dateutil import parser
 
+import numpy as np
+
 from qiskit.providers import BackendV2, Options, JobV1 as Job
 from qiskit_aer import AerSimulator
-from qiskit import qpy
+from qiskit_aer.primitives import SamplerV2, EstimatorV2
+from qiskit import qpy, generate_preset_pass_manager
 from qiskit.providers import JobStatus
 from qiskit_ibm_runtime.utils import RuntimeDecoder
+from utils.tracing import span, inject_headers, current_traceparent
+from utils.parameters import encode_parameter_values
+from utils.observables import encode_observables, decode_observables, estimator_observables
 
 class RemoteAerJob(Job):
 
     def __init__(self, backend, job_id):
         super().__init__(backend=backend, job_id=job_id)
         self._result_cache = None
+        # per-pass transpiler profile (only when run with profile=True)
+        self.profile = None
+        # trace context of the submission, polling spans join the same trace
+        self.traceparent = None
         self._transpiler_url = os.getenv('TRANSPILER_SERVICE_URL', 'http://transpiler-service:5002')
         self._timeout = int(os.getenv('JOB_TIMEOUT', '600'))
+        self._poll_interval = float(os.getenv('JOB_POLL_INTERVAL', '5'))
         
 
     
-    def _poll_for_result(self, interval=5):
+    def _poll_for_result(self, interval=None):
         """Poll for job completion"""
+        interval = interval or self._poll_interval
         start = time.time()
 
         while time.time() - start < self._timeout:
@@ -34,6 +47,7 @@ class RemoteAerJob(Job):
                 # Check status
                 response = requests.get(
                     f"{self._transpiler_url}/job/{self.job_id()}/status",
+                    headers=inject_headers(),
                     timeout=10
                 )
                 
@@ -45,6 +59,7 @@ class RemoteAerJob(Job):
                         # Get result
                         result_resp = requests.get(
                             f"{self._transpiler_url}/job/{self.job_id()}/result",
+                            headers=inject_headers(),
                             timeout=10
                         )
                         result_b64 = result_resp.json()['result']
@@ -73,7 +88,8 @@ class RemoteAerJob(Job):
    
     def result(self):
         if self._result_cache is None:
-            self._result_cache = self._poll_for_result()
+            with span("client.poll_result", traceparent=self.traceparent, job_id=self.job_id()):
+                self._result_cache = self._poll_for_result()
         return self._result_cache
     
     def status(self):
@@ -103,6 +119,39 @@ class RemoteAerJob(Job):
         pass
     
 
+class LocalAerJob(Job):
+    """
+    Job run in-process with AerSimulator (tiny circuits, or transpiler
+    service unreachable), with the same result interface as RemoteAerJob
+    """
+
+    def __init__(self, backend, job_id, run):
+        """
+        :param backend: RemoteAerBackend the job was submitted to
+        :param job_id: ID of the job
+        :param run: callable returning the PrimitiveResult of the job
+        """
+        super().__init__(backend=backend, job_id=job_id)
+        self._run = run
+        self._result_cache = None
+        self.profile = None
+        self.traceparent = current_traceparent()
+
+    def result(self):
+        if self._result_cache is None:
+            with span("client.local_run", traceparent=self.traceparent, job_id=self.job_id()):
+                self._result_cache = self._run()
+            print("✅ Results computed locally")
+        return self._result_cache
+
+    def status(self):
+        """Get current job status"""
+        return JobStatus.DONE if self._result_cache is not None else JobStatus.QUEUED
+
+    def submit(self):
+        pass
+
+
 class RemoteAerBackend(BackendV2):
 
     def __init__(self, name): 
@@ -119,6 +168,12 @@ class RemoteAerBackend(BackendV2):
         )
         self.timeout = int(os.getenv('JOB_TIMEOUT', '600'))
 
+        # jobs at or below both thresholds run in-process instead of on the cluster
+        self.local_max_qubits = int(os.getenv('LOCAL_MAX_QUBITS', '8'))
+        self.local_max_shots = int(os.getenv('LOCAL_MAX_SHOTS', '100000'))
+        # debug: always go through the transpiler service and simulator pods
+        self.force_remote = os.getenv('REMOTE_AER_FORCE_REMOTE', '0').lower() in ('1', 'true', 'yes')
+
         
         print(f"Remote AerBackend configured with URL: {self.transpiler_url}")
 
@@ -129,35 +184,187 @@ class RemoteAerBackend(BackendV2):
     
   
     def run(self, circuits, **options):
+        """
+        Submit circuits to the remote simulator
+
+        :param circuits: QuantumCircuit, or a list of circuits and / or PUB-like
+            ``(circuit, parameter_values)`` tuples. Parameterized circuits are
+            transpiled once and sampled at every row of ``parameter_values``.
+
+        Passing ``observables`` (one entry per circuit, an observable or a list of
+        observables; the observables of the single circuit when ``circuits`` is not
+        a list) runs an estimator job: only expectation values and standard errors
+        are returned. ``precision`` is their target standard error, 0 gives exact
+        expectation values on the noiseless simulator.
+
+        ``aer-simulator`` jobs of at most ``LOCAL_MAX_QUBITS`` qubits and
+        ``LOCAL_MAX_SHOTS`` shots (times parameter bindings) run in-process, as
+        do all ``aer-simulator`` jobs while the transpiler service is unreachable.
+        ``force_remote=True`` (or ``REMOTE_AER_FORCE_REMOTE=1``) disables both.
+
+        ``method`` and ``simulation_precision`` (``"double"`` or ``"single"``) are
+        passed to Aer as its ``method`` and ``precision`` options; they also size
+        the simulator pod (``precision`` remains the estimator standard error).
+        """
         # Get options
         shots = options.get('shots', 1024)
+        profile = options.get('profile', False)
+        profile_memory = options.get('profile_memory', False)
+        # seeded jobs are deterministic and may opt in to the result cache
+        simulator_options = {}
+        if options.get('seed_simulator') is not None:
+            simulator_options['seed_simulator'] = options['seed_simulator']
+        if options.get('method') is not None:
+            simulator_options['method'] = options['method']
+        # Aer state precision, distinct from the estimator `precision`
+        if options.get('simulation_precision') is not None:
+            simulator_options['precision'] = options['simulation_precision']
+        cache_results = options.get('cache_results', False)
+        # identical in-flight submissions attach to the running job
+        coalesce = options.get('coalesce', True)
+        idempotency_key = options.get('idempotency_key')
+        observables = options.get('observables')
+        precision = options.get('precision', 0.0)
+        force_remote = options.get('force_remote', self.force_remote)
 
         # Serialize circuits using QPY
         if not isinstance(circuits, list):
             circuits = [circuits]
+            if observables is not None:
+                observables = [observables]
 
+        # split PUB-like tuples into templates and parameter arrays
+        templates, raw_values = [], []
+        for item in circuits:
+            if isinstance(item, tuple):
+                circuit, values = item[0], (item[1] if len(item) > 1 else None)
+            else:
+                circuit, values = item, None
+            templates.append(circuit)
+            raw_values.append(values)
+        parameter_values = [
+            encode_parameter_values(values) if values is not None else None
+            for values in raw_values
+        ]
+
+        job_id = uuid.uuid4().hex[:16]
+        # profiling is done by the transpiler service, keep those jobs remote
+        local_allowed = (self.name == "aer-simulator" and not force_remote
+                         and not (profile or profile_memory))
+
+        def run_local():
+            return self._run_local(templates, raw_values, shots, simulator_options,
+                                   observables, precision)
+
+        if local_allowed and self._is_tiny(templates, raw_values, shots):
+            print(f"Running {len(templates)} circuit(s) locally...")
+            return LocalAerJob(backend=self, job_id=job_id, run=run_local)
         
-        print(f"Sending {len(circuits)} circuit(s) to remote simulator...")
+        print(f"Sending {len(templates)} circuit(s) to remote simulator...")
 
         # use QPY to serialize 
         ## can we use RuntimeEncoder??
         with io.BytesIO() as fptr:
-            qpy.dump(circuits, fptr)
+            qpy.dump(templates, fptr)
             circuit_bytes = fptr.getvalue()
             circuits_b64 = base64.b64encode(circuit_bytes).decode('utf-8')
-        
+
+        payload = {
+            'circuits_qpy': circuits_b64,
+            'shots' : shots,
+            'backend_name' : self.name,
+            'job_id' : job_id,
+            'profile' : profile,
+            'profile_memory' : profile_memory,
+            'simulator_options' : simulator_options,
+            'cache_results' : cache_results,
+            'coalesce' : coalesce
+        }
+        if any(values is not None for values in parameter_values):
+            payload['parameter_values'] = parameter_values
+        if observables is not None:
+            payload['observables'] = [encode_observables(obs) for obs in observables]
+            payload['precision'] = precision
+
         # Send to transpiler
+        with span("client.run", job_id=job_id, backend=self.name, shots=shots):
+            try:
+                return self._submit(payload, idempotency_key)
+            except ConnectionError as e:
+                if not local_allowed:
+                    raise
+                print(f"⚠️ {e}, running locally instead")
+                return LocalAerJob(backend=self, job_id=job_id, run=run_local)
+
+    def _is_tiny(self, templates, raw_values, shots):
+        """
+        Whether the job is small enough to run in-process
+
+        :param templates: circuits of the job
+        :param raw_values: parameter arrays (or None), one per circuit
+        :param shots: Number of shots
+        """
+        bindings = max(
+            (int(np.prod(np.shape(values)[:-1])) for values in raw_values if values is not None),
+            default=1
+        )
+        return (max(circuit.num_qubits for circuit in templates) <= self.local_max_qubits
+                and shots * bindings <= self.local_max_shots)
+
+    def _run_local(self, templates, raw_values, shots, simulator_options, observables = None,
+                   precision = 0.0):
+        """
+        Transpile and simulate the job in-process with AerSimulator
+
+        :param templates: circuits of the job
+        :param raw_values: parameter arrays (or None), one per circuit
+        :param shots: Number of shots for sampling
+        :param simulator_options: AerSimulator options (e.g. seed_simulator)
+        :param observables: observables of an estimator job, one entry per circuit
+        :param precision: target standard error of the expectation values
+        """
+        if observables is not None:
+            templates = [circuit.remove_final_measurements(inplace=False) for circuit in templates]
+        pm = generate_preset_pass_manager(optimization_level=1, target=self.target)
+        isa_circuits = pm.run(templates)
+
+        if observables is None:
+            sampler = SamplerV2.from_backend(AerSimulator(**simulator_options),
+                                             seed=simulator_options.get('seed_simulator'))
+            pubs = [circuit if values is None else (circuit, values)
+                    for circuit, values in zip(isa_circuits, raw_values)]
+            return sampler.run(pubs, shots=shots).result()
+
+        pubs = []
+        for circuit, values, obs in zip(isa_circuits, raw_values, observables):
+            # observables follow the layout of the transpiled circuit
+            encoded = encode_observables(obs)
+            mapped = [op.apply_layout(circuit.layout) for op in decode_observables(encoded)]
+            encoded = encode_observables(mapped[0] if encoded['scalar'] else mapped)
+            pub = (circuit, estimator_observables(encoded, parameterized=values is not None))
+            pubs.append(pub if values is None else pub + (values,))
+
+        run_options = {}
+        if simulator_options.get('seed_simulator') is not None:
+            run_options['seed_simulator'] = simulator_options['seed_simulator']
+        estimator = EstimatorV2.from_backend(
+            AerSimulator(**{"method": "statevector", **simulator_options}),
+            options={"default_precision": precision, "run_options": run_options}
+        )
+        return estimator.run(pubs).result()
+
+    def _submit(self, payload, idempotency_key = None):
+        """
+        POST the serialized circuits to the transpiler service
+        """
+        headers = inject_headers()
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
         try:
-            job_id = uuid.uuid4().hex[:16]
             response = requests.post(
                 f"{self.transpiler_url}/transpile",
-                json={
-                    'circuits_qpy': circuits_b64,
-                    'shots' : shots,
-                    'backend_name' : self.name,
-                    'job_id' : job_id
-                   },
-                
+                json = payload,
+                headers = headers,
                 timeout = 30                   
             )
 
@@ -165,10 +372,23 @@ class RemoteAerBackend(BackendV2):
                 
                 result_data = response.json()
                 returned_job_id = result_data['job_id']
-                return RemoteAerJob(backend=self, job_id=returned_job_id)
+                job = RemoteAerJob(backend=self, job_id=returned_job_id)
+                job.profile = result_data.get('profile')
+                job.traceparent = current_traceparent()
+                return job
             else:
                 raise Exception(f"Simulator error: {response.text}")
             
+        except requests.exceptions.ConnectTimeout as e:
+            raise ConnectionError(f"Failed to reach transpiler: {str(e)}")
+        except requests.exceptions.ConnectionError as e:
+            # only a refused / unresolvable connection means the request was never
+            # sent. An aborted connection or a read timeout may follow an accepted
+            # job, running it locally would run it twice.
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            if isinstance(reason, NewConnectionError):
+                raise ConnectionError(f"Failed to reach transpiler: {str(e)}")
+            raise Exception(f"Failed to reach transpiler: {str(e)}")
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to reach transpiler: {str(e)}")
               
@@ -1,23 +1,67 @@
-import os,sys,io,base64,json, traceback
+import os,sys,io,base64,json, traceback, time, random
 
+# process start, used to trace pod scheduling and import time
+PROCESS_START = time.time()
+MAIN_START = None
+
+# first, so that STARTUP_PROFILE=1 times every import below
+from utils.startup import profiler as startup_profiler, STARTUP_PROFILE
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 from qiskit import qpy
-from qiskit_ibm_runtime import QiskitRuntimeService, SamplerV2
-from qiskit_ibm_runtime.utils import RuntimeEncoder
+from qiskit.primitives import BitArray, DataBin, PrimitiveResult, SamplerPubResult
 from qiskit_aer import AerSimulator
-from kubernetes import client, config
+from qiskit_aer.primitives import EstimatorV2, SamplerV2
 from utils.redisDB import RedisDB
+from utils.metrics import SIMULATOR_STAGE_SECONDS, SIMULATOR_CHUNKS_TOTAL, timed, push_simulator_metrics
+from utils.tracing import init_tracing, shutdown_tracing, span, record_span
+from utils.parameters import decode_parameter_values
+from utils.observables import estimator_observables
+
+
+# qiskit_ibm_runtime (result encoding, IBM backends) and kubernetes (CR updates)
+# are only needed once the simulation is running, they are imported in the
+# background meanwhile (aer releases the GIL while simulating)
+PREFETCH_MODULES = ["kubernetes", "qiskit_ibm_runtime.utils"]
+
+def prefetch_imports(modules = PREFETCH_MODULES):
+    """
+    Import modules in a background thread, later imports wait for it if still running
+    
+    :param modules: modules to import
+    """
+    def prefetch():
+        for module in modules:
+            try:
+                __import__(module)
+            except Exception as e:
+                print(f"⚠️ Failed to prefetch {module}: {e}")
+
+    thread = threading.Thread(target=prefetch, name="prefetch-imports", daemon=True)
+    thread.start()
+    return thread
 
+_kube_config_loaded = False
 
 def load_kube_config():
     """
-    load kubernetes configuration (in cluster)
+    load kubernetes configuration (in cluster), once per process
     """
+    global _kube_config_loaded
+    if _kube_config_loaded:
+        return
+    from kubernetes import config
+
     try:
         # loads service account token
         # kubernetes add the token to access the service account
         # in a standard path /var/run/secrets/kubernetes.io/serviceaccount/token
         # token is used while updating the CR.
         config.load_incluster_config()
+        _kube_config_loaded = True
 
         print("✅ Loaded in-cluster Kubernetes config")
     
@@ -33,6 +77,8 @@ def init_ibm_service():
     Initialize Qiskit Runtime Service
     """
     global service
+    from qiskit_ibm_runtime import QiskitRuntimeService
+
     IBM_API_KEY = os.getenv('IBM_API_KEY')
     IBM_INSTANCE = os.getenv('IBM_INSTANCE')  
 
@@ -66,7 +112,8 @@ def get_env_vars():
         'quantum_job_name': os.getenv('QUANTUM_JOB_NAME'),
         'quantum_job_namespace': os.getenv('QUANTUM_JOB_NAMESPACE', 'default'),
         'redis_host' : os.getenv("REDIS_HOST"),
-        'redis_port' : os.getenv("REDIS_PORT")
+        'redis_port' : os.getenv("REDIS_PORT"),
+        'traceparent' : os.getenv("TRACEPARENT")
     }
 
 def deserialize_circuits(circuits_b64):
@@ -84,47 +131,267 @@ def deserialize_circuits(circuits_b64):
     except Exception as e:
         raise ValueError(f"Failed to deserialize circuits: {e}")
 
+# deserialized circuits by content hash, keeps hot circuits in a warm simulator
+CIRCUIT_CACHE_SIZE = int(os.getenv("CIRCUIT_CACHE_SIZE", "16"))
+_circuit_cache = OrderedDict()
+
+def load_circuits(redis_client, job_data):
+    """
+    Load the circuits of a job, by content hash through the local cache
+
+    :param redis_client: RedisDB instance
+    :param job_data: job record from redis
+    """
+    circuit_hash = job_data.get("circuit_hash")
+
+    # records written before the content-addressed store hold the circuit inline
+    if not circuit_hash:
+        circuits_b64 = job_data.get("circuit", None)
+        if not circuits_b64:
+            raise ValueError("Job data holds no circuit")
+        return deserialize_circuits(circuits_b64)
+
+    if circuit_hash in _circuit_cache:
+        _circuit_cache.move_to_end(circuit_hash)
+        print(f"♻️ Circuit {circuit_hash[:12]} served from local cache")
+        return _circuit_cache[circuit_hash]
+
+    circuits_b64 = redis_client.get_circuit(circuit_hash)
+    if not circuits_b64:
+        raise ValueError(f"Circuit not found in databse for hash: {circuit_hash}")
+    circuits = deserialize_circuits(circuits_b64)
+
+    _circuit_cache[circuit_hash] = circuits
+    while len(_circuit_cache) > CIRCUIT_CACHE_SIZE:
+        _circuit_cache.popitem(last=False)
+    return circuits
+
 def serialize_results(results):
     """
     Serialize the result to base64-encoded JSON
     
     :param results: PrimitiveResult object.
     """
+    from qiskit_ibm_runtime.utils import RuntimeEncoder
+
     result_json = json.dumps(results, cls=RuntimeEncoder)
     result_bytes = result_json.encode("utf-8")
     result_b64 = base64.b64encode(result_bytes).decode("utf-8")
     return result_b64
 
-def run_simulation(circuits, shots, backend_name):
+def deserialize_results(result_b64):
+    """
+    Deserialize a result serialized by serialize_results
+    
+    :param result_b64: base64-encoded JSON result
+    """
+    from qiskit_ibm_runtime.utils import RuntimeDecoder
+
+    result_json = base64.b64decode(result_b64).decode("utf-8")
+    return json.loads(result_json, cls=RuntimeDecoder)
+
+def build_pubs(circuits, parameter_values = None):
+    """
+    Pair parameterized circuits with their parameter arrays (SamplerV2 PUBs)
+    
+    :param circuits: Quantum Circuits
+    :param parameter_values: list of base64 .npy arrays (or None), one per circuit
+    """
+    if not parameter_values:
+        return circuits
+    return [
+        (circuit, decode_parameter_values(values)) if values is not None else circuit
+        for circuit, values in zip(circuits, parameter_values)
+    ]
+
+def build_estimator_pubs(circuits, observables, parameter_values = None):
+    """
+    Pair circuits with their observables (and parameter arrays) as EstimatorV2 PUBs
+    
+    :param circuits: Quantum Circuits
+    :param observables: list of encoded observables, one per circuit
+    :param parameter_values: list of base64 .npy arrays (or None), one per circuit
+    """
+    parameter_values = parameter_values or [None] * len(circuits)
+    pubs = []
+    for circuit, encoded, values in zip(circuits, observables, parameter_values):
+        if values is None:
+            pubs.append((circuit, estimator_observables(encoded)))
+        else:
+            pubs.append((circuit, estimator_observables(encoded, parameterized=True),
+                         decode_parameter_values(values)))
+    return pubs
+
+def get_simulator(backend_name, simulator_options = None):
+    """
+    AerSimulator for the backend, with the noise model of the IBM backend
+    
+    :param backend_name: Name of the backend
+    :param simulator_options: AerSimulator options (e.g. seed_simulator)
+    """
+    simulator_options = simulator_options or {}
+
+    if backend_name == "aer-simulator":
+        return AerSimulator(**simulator_options)
+
+    if service is None:
+        init_ibm_service()
+    
+    if service is None:
+        raise RuntimeError("IBM Quantum service not available")
+    
+    backend = service.backend(backend_name)
+    return AerSimulator.from_backend(backend, **simulator_options)
+
+def run_simulation(circuits, shots, backend_name, simulator_options = None, simulator = None):
     """
     Execution of the circuit with AerSimulator
     
-    :param circuits: Quantum Circuit
+    :param circuits: Quantum Circuits or (circuit, parameter_values) PUBs,
+        every binding of a PUB is run in a single Aer call
     :param shots: Number of shots for sampling
     :param backend_name: Name of the backend
+    :param simulator_options: AerSimulator options (e.g. seed_simulator)
+    :param simulator: AerSimulator built by get_simulator, reused across calls
     """
+    simulator_options = simulator_options or {}
 
     print(f"🔬 Starting simulation with {shots} shots on {backend_name}")
 
-    if backend_name == "aer-simulator":
-        simulator = AerSimulator()
-    else:
-        if service is None:
-            init_ibm_service()
-        
-        if service is None:
-            raise RuntimeError("IBM Quantum service not available")
-        
-        backend = service.backend(backend_name)
-        simulator = AerSimulator.from_backend(backend)
-    
-    sampler = SamplerV2(mode=simulator)
+    if simulator is None:
+        simulator = get_simulator(backend_name, simulator_options)
+    
+    # aer sampler directly, the IBM runtime local mode only wraps it
+    sampler = SamplerV2.from_backend(simulator, seed=simulator_options.get("seed_simulator"))
     # Run simulation
     job = sampler.run(pubs=circuits, shots=shots)
     results = job.result()
     print("✅ Simulation completed successfully")
     return results
 
+def run_estimation(pubs, shots, backend_name, precision = 0.0, simulator_options = None):
+    """
+    Expectation values of the observables with the Aer EstimatorV2.
+    Only expectation values and standard errors are returned, no shots.
+        - noiseless, precision 0: exact statevector expectation values
+        - noisy backends: averaged over `shots` noisy trajectories
+        - precision > 0: expectation values with gaussian noise of that standard error
+    
+    :param pubs: (circuit, observables[, parameter_values]) PUBs
+    :param shots: Number of trajectories of noisy simulations
+    :param backend_name: Name of the backend
+    :param precision: target standard error of the expectation values
+    :param simulator_options: AerSimulator options (e.g. seed_simulator)
+    """
+    simulator_options = dict(simulator_options or {})
+
+    print(f"🔬 Starting estimation (precision {precision}) on {backend_name}")
+
+    run_options = {}
+    if "seed_simulator" in simulator_options:
+        run_options["seed_simulator"] = simulator_options["seed_simulator"]
+    if backend_name == "aer-simulator":
+        # exact expectation values of the final state
+        simulator_options.setdefault("method", "statevector")
+    else:
+        run_options["shots"] = shots
+
+    simulator = get_simulator(backend_name, simulator_options)
+    estimator = EstimatorV2.from_backend(simulator, options={
+        "default_precision": precision,
+        "run_options": run_options
+    })
+    job = estimator.run(pubs)
+    results = job.result()
+    print("✅ Estimation completed successfully")
+    return results
+
+# long sampler jobs run in chunks of this many shots, every completed chunk is
+# checkpointed to redis so that a retried pod resumes instead of restarting
+SHOT_CHUNK_SIZE = int(os.getenv("SHOT_CHUNK_SIZE", "100000"))
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL_SECONDS", "3600"))
+
+def chunk_sizes(shots, chunk_shots):
+    """
+    Split the shots in chunks of chunk_shots (the last one may be smaller)
+    """
+    sizes = [chunk_shots] * (shots // chunk_shots)
+    if shots % chunk_shots:
+        sizes.append(shots % chunk_shots)
+    return sizes
+
+def merge_results(chunks):
+    """
+    Merge the sampler results of shot chunks into one result
+    
+    :param chunks: PrimitiveResults of the chunks, same PUBs in the same order
+    """
+    pub_results = []
+    for pub_chunks in zip(*chunks):
+        first = pub_chunks[0]
+        data = {
+            name: BitArray.concatenate_shots([chunk.data[name] for chunk in pub_chunks])
+            for name in first.data.keys()
+        }
+        metadata = dict(first.metadata)
+        metadata["shots"] = sum(chunk.metadata.get("shots", 0) for chunk in pub_chunks)
+        pub_results.append(SamplerPubResult(DataBin(**data, shape=first.data.shape), metadata))
+    return PrimitiveResult(pub_results, metadata={**chunks[0].metadata, "shot_chunks": len(chunks)})
+
+def run_checkpointed_simulation(redis_client, job_id, pubs, shots, backend_name,
+                                simulator_options = None, circuit_hash = None):
+    """
+    Run the sampler in shot chunks, checkpointing each completed chunk (result
+    and seed) to redis. Chunks completed by a previous pod of the job are skipped.
+    
+    :param redis_client: RedisDB instance
+    :param job_id: ID of the job
+    :param pubs: Quantum Circuits or (circuit, parameter_values) PUBs
+    :param shots: Number of shots for sampling
+    :param backend_name: Name of the backend
+    :param simulator_options: AerSimulator options (e.g. seed_simulator)
+    :param circuit_hash: circuit of the job, kept in redis as long as the checkpoint
+    """
+    simulator_options = simulator_options or {}
+    if SHOT_CHUNK_SIZE <= 0 or shots <= SHOT_CHUNK_SIZE:
+        return run_simulation(pubs, shots, backend_name, simulator_options)
+
+    checkpoint = redis_client.get_checkpoint(job_id)
+    if checkpoint is None or checkpoint["shots"] != shots:
+        # chunk seeds derive from one seed, a resumed job samples the same chunks
+        checkpoint = {
+            "shots": shots,
+            "chunk_shots": SHOT_CHUNK_SIZE,
+            "seed": simulator_options.get("seed_simulator", random.randrange(2 ** 31))
+        }
+        redis_client.put_checkpoint(job_id, checkpoint, ttl = CHECKPOINT_TTL)
+
+    sizes = chunk_sizes(shots, checkpoint["chunk_shots"])
+    chunks = []
+    # built once (noise model included), every chunk only changes the sampler seed
+    simulator = None
+    for index, chunk_shots in enumerate(sizes):
+        chunk_b64 = redis_client.get_checkpoint_chunk(job_id, index)
+        if chunk_b64:
+            print(f"♻️ Shot chunk {index + 1}/{len(sizes)} resumed from checkpoint")
+            SIMULATOR_CHUNKS_TOTAL.labels(outcome="resumed").inc()
+            chunks.append(deserialize_results(chunk_b64))
+            continue
+
+        if simulator is None:
+            simulator = get_simulator(backend_name, simulator_options)
+        chunk_options = {**simulator_options, "seed_simulator": checkpoint["seed"] + index}
+        with span("simulator.shot_chunk", index=index, shots=chunk_shots):
+            result = run_simulation(pubs, chunk_shots, backend_name, chunk_options,
+                                    simulator = simulator)
+        redis_client.put_checkpoint_chunk(job_id, index, serialize_results(result),
+                                          ttl = CHECKPOINT_TTL, circuit_hash = circuit_hash)
+        SIMULATOR_CHUNKS_TOTAL.labels(outcome="simulated").inc()
+        print(f"💾 Shot chunk {index + 1}/{len(sizes)} checkpointed")
+        chunks.append(result)
+
+    return merge_results(chunks)
+
 def update_quantum_job_status(namespace, name, success = True, error_message = None):
     """
     Update Quantum Job Status.
@@ -136,6 +403,8 @@ def update_quantum_job_status(namespace, name, success = True, error_message = N
     :param success: Status of Job
     :param error_message: Error message
     """
+    from kubernetes import client
+
     try:
         api  = client.CustomObjectsApi()
 
@@ -158,55 +427,117 @@ def update_quantum_job_status(namespace, name, success = True, error_message = N
         print(f"❌ Status Update Failed: {e}")
         raise
 
-def main():
+def record_scheduling_spans(namespace, name, traceparent, job_id):
     """
-    Main execution flow
+    Reconstruct the operator and pod scheduling phases of the job as spans,
+    from the timestamps recorded on the QuantumJob CR.
+
+    :param namespace: Namespace of QuantumJob CR
+    :param name: Name of QuantumJob CR
+    :param traceparent: W3C trace context of the job
+    :param job_id: ID of the job
     """
+    from kubernetes import client
 
-    print("="*60) 
-    print("Quantum Simulator Job Starting")
-    print("="*60) 
+    def to_epoch(timestamp):
+        return datetime.fromisoformat(timestamp).timestamp() if timestamp else None
 
     try:
-        load_kube_config()
-        # Get environment variables
-        config_vars = get_env_vars()
+        api = client.CustomObjectsApi()
+        job = api.get_namespaced_custom_object(
+            group = "aerjob.nav.io",
+            version= "v3",
+            namespace= namespace,
+            plural = "quantumaerjobs",
+            name = name
+        )
+        status = job.get("status", {})
+        created = to_epoch(job["metadata"].get("creationTimestamp"))
+        started = to_epoch(status.get("startTime"))
+        pod_created = to_epoch(status.get("podCreatedTime"))
+
+        # CR created -> first reconcile -> simulator pod created -> container running
+        record_span("operator.admit", created, started, traceparent, job_id)
+        record_span("operator.reconcile", started, pod_created, traceparent, job_id,
+                    retries=status.get("retries", 0))
+        record_span("pod.scheduling", pod_created, PROCESS_START, traceparent, job_id)
+        record_span("simulator.imports", PROCESS_START, MAIN_START, traceparent, job_id)
+    except Exception as e:
+        print(f"⚠️ Could not record scheduling spans: {e}")
 
-        print(f"📋 Job ID: {config_vars['job_id']}")
-        print(f"📋 Backend: {config_vars['backend_name']}")
-        print(f"📋 Shots: {config_vars['shots']}")
-        print(f"📋 Redis Host: {config_vars['redis_host']}")
-        print(f"📋 Redis Port: {config_vars['redis_port']}")
+@contextmanager
+def stage(name, timings):
+    """
+    Time a stage of the job as a histogram observation and a span
 
-        # initialize the redis instance
+    :param name: Name of the stage
+    :param timings: dict collecting the per-job stage timings
+    """
+    with timed(SIMULATOR_STAGE_SECONDS, timings, stage=name), span(f"simulator.{name}"):
+        yield
+
+def run_job(config_vars, timings):
+    """
+    Run the job described by the environment, end to end
+
+    :param config_vars: Environment variables (see get_env_vars)
+    :param timings: dict collecting the per-job stage timings
+    """
+    # initialize the redis instance
+    with startup_profiler.step("redis_connect"):
         redis_client = RedisDB(redis_host=config_vars["redis_host"],
                                redis_port= config_vars["redis_port"])
 
-        # Validate
+    # Validate
+    with stage("redis_fetch", timings):
         job_data = redis_client.get_job_data(config_vars["job_id"])
-        circuits_b64 = job_data.get("circuit", None)
-        
-        if not circuits_b64:
-            raise ValueError(f"Job data not found in databse for key: {config_vars["job_id"]}")
-        if not config_vars["quantum_job_name"]:
-            raise ValueError("QUANTUM_JOB_NAME environment variable is required.")
-        if not config_vars["job_id"]:
-            raise ValueError("Job_ID environment variable is required.")
-        
-        # Deserialize circuits
-        circuits = deserialize_circuits(circuits_b64)
-
-        # Run simulation
-        results = run_simulation(
-            circuits,
-            config_vars['shots'],
-            config_vars['backend_name']
-        )
+    
+    if not job_data:
+        raise ValueError(f"Job data not found in databse for key: {config_vars['job_id']}")
+    if not config_vars["quantum_job_name"]:
+        raise ValueError("QUANTUM_JOB_NAME environment variable is required.")
+    if not config_vars["job_id"]:
+        raise ValueError("Job_ID environment variable is required.")
+    
+    # Fetch (by content hash) and deserialize circuits
+    with stage("deserialize", timings):
+        circuits = load_circuits(redis_client, job_data)
+        estimator = job_data.get("estimator")
+        if estimator:
+            pubs = build_estimator_pubs(circuits, estimator["observables"],
+                                        job_data.get("parameter_values"))
+        else:
+            pubs = build_pubs(circuits, job_data.get("parameter_values"))
+
+    # Run simulation
+    with stage("simulate", timings):
+        if estimator:
+            results = run_estimation(
+                pubs,
+                config_vars['shots'],
+                config_vars['backend_name'],
+                estimator.get("precision", 0.0),
+                job_data.get("simulator_options")
+            )
+        else:
+            results = run_checkpointed_simulation(
+                redis_client,
+                config_vars['job_id'],
+                pubs,
+                config_vars['shots'],
+                config_vars['backend_name'],
+                job_data.get("simulator_options"),
+                job_data.get("circuit_hash")
+            )
 
-        # Serialize result
+    # Serialize result
+    with stage("serialize", timings):
         result_b64 = serialize_results(results=results)
 
-        # Update QuantumJob CR
+    # Update QuantumJob CR
+    with stage("cr_patch", timings):
+        with startup_profiler.step("load_kube_config"):
+            load_kube_config()
         update_quantum_job_status(
             config_vars['quantum_job_namespace'], 
             config_vars['quantum_job_name'],  
@@ -214,10 +545,86 @@ def main():
             error_message=None
         )
 
-        # write back result to redis
-        job_data['results'] = result_b64
+    # write back result to redis
+    job_data['results'] = result_b64
+    with stage("result_write", timings):
+        job_data['timings'] = timings
+        if STARTUP_PROFILE:
+            job_data['startup'] = startup_profiler.report()
         redis_client.update_job_data(config_vars["job_id"], job_data)
 
+        # deterministic (seeded) job, memoize the result for identical resubmissions
+        result_cache = job_data.get("result_cache")
+        if result_cache:
+            # best effort, the job already completed with its result stored
+            try:
+                redis_client.put_cached_result(result_cache["key"], result_b64,
+                                               ttl=result_cache["ttl"],
+                                               max_entries=result_cache["max_entries"])
+            except Exception as e:
+                print(f"⚠️ Failed to cache result: {e}")
+
+        # identical submissions no longer attach to this job
+        if job_data.get("inflight_key"):
+            redis_client.release_inflight(job_data["inflight_key"], config_vars["job_id"])
+
+        # result is stored, the shot chunks are no longer needed
+        if not estimator and SHOT_CHUNK_SIZE > 0 and config_vars['shots'] > SHOT_CHUNK_SIZE:
+            checkpoint = redis_client.get_checkpoint(config_vars["job_id"])
+            if checkpoint:
+                redis_client.delete_checkpoint(
+                    config_vars["job_id"],
+                    len(chunk_sizes(checkpoint["shots"], checkpoint["chunk_shots"]))
+                )
+
+def main():
+    """
+    Main execution flow
+    """
+    global MAIN_START
+    MAIN_START = time.time()
+
+    print("="*60) 
+    print("Quantum Simulator Job Starting")
+    print("="*60) 
+
+    # per-job stage timings (seconds), stored with the job in redis
+    timings = {}
+
+    timings["imports"] = round(MAIN_START - PROCESS_START, 6)
+
+    try:
+        # overlaps with redis fetch and simulation
+        prefetch_imports()
+        with startup_profiler.step("init_tracing"):
+            init_tracing("aer-simulator")
+        # Get environment variables
+        config_vars = get_env_vars()
+
+        print(f"📋 Job ID: {config_vars['job_id']}")
+        print(f"📋 Backend: {config_vars['backend_name']}")
+        print(f"📋 Shots: {config_vars['shots']}")
+        print(f"📋 Redis Host: {config_vars['redis_host']}")
+        print(f"📋 Redis Port: {config_vars['redis_port']}")
+
+        with span("simulator.job", traceparent=config_vars['traceparent'],
+                  job_id=config_vars['job_id'], backend=config_vars['backend_name'],
+                  shots=config_vars['shots']):
+            run_job(config_vars, timings)
+
+        # spans carry their own timestamps, recorded once kubernetes is loaded
+        record_scheduling_spans(
+            config_vars['quantum_job_namespace'],
+            config_vars['quantum_job_name'],
+            config_vars['traceparent'],
+            config_vars['job_id']
+        )
+        startup_profiler.print_report("aer-simulator")
+
+        print(f"⏱️ Stage timings (s): {timings}")
+        push_simulator_metrics(config_vars["backend_name"])
+        shutdown_tracing()
+
         print("="*60)
         print("✅ Job completed successfully")
         print("=" * 60)
@@ -234,6 +641,7 @@ def main():
         try:
             config_vars = get_env_vars()
             if config_vars["quantum_job_name"]:
+                load_kube_config()
                 update_quantum_job_status(
                     config_vars["quantum_job_namespace"], 
                     config_vars["quantum_job_name"],
@@ -243,6 +651,9 @@ def main():
         except:
             print("⚠️ Could not update CR with failure status")
 
+        push_simulator_metrics(os.getenv("BACKEND_NAME", "aer-simulator"))
+        shutdown_tracing()
+
         sys.exit(1) # pod phase marked as failed.
 
 if __name__ == "__main__" :
@@ -1,19 +1,37 @@
 import io
 import base64
+import calendar
 import json
 import os
 import sys
 import uuid
 import time
+import threading
 import traceback
+from contextlib import contextmanager
+
+# first, so that STARTUP_PROFILE=1 times every import below
+from utils.startup import profiler as startup_profiler
+
+import numpy as np
 
 from flask import Flask, request, Response, jsonify
 from qiskit import QuantumCircuit, generate_preset_pass_manager,qpy
-from qiskit_ibm_runtime.utils import RuntimeEncoder, RuntimeDecoder
-from qiskit_ibm_runtime import QiskitRuntimeService
+import qiskit_aer
 from qiskit_aer import AerSimulator
-from kubernetes import client, config
-from utils.redisDB import RedisDB
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from utils.redisDB import RedisDB, content_hash
+from utils.circuits import circuits_hash
+from utils.profiler import PassProfiler
+from utils.parameters import decode_parameter_values
+from utils.observables import decode_observables, encode_observables
+from utils.resources import estimate_resources, merge_resources, ResourceError
+from utils.tracing import init_tracing, span, current_traceparent
+from utils.metrics import (
+    TRANSPILER_STAGE_SECONDS, REDIS_OP_SECONDS, K8S_OP_SECONDS,
+    QUEUE_DEPTH, PAYLOAD_BYTES, CIRCUIT_STORE_TOTAL, RESULT_CACHE_TOTAL,
+    INFLIGHT_TOTAL, SIZING_TOTAL, timed
+)
 
 
 ##=============INTIALISING REDIS=================
@@ -30,12 +48,26 @@ K8S_NAMESPACE = os.getenv('K8S_NAMESPACE', 'default')
 JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '600'))
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
 DEFAULT_TTL = int(os.getenv('DEFAULT_TTL_SECONDS', '300'))
-
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL_SECONDS', '86400'))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '1000'))
+# seed of the stochastic layout / routing passes, identical circuits transpile
+# to identical ISA circuits (and result cache keys)
+TRANSPILER_SEED = int(os.getenv('TRANSPILER_SEED', '1234'))
+# a job record without CR younger than this is still being submitted
+CR_CREATE_GRACE = 30
+
+# qiskit_ibm_runtime and kubernetes are imported, and their clients created,
+# in a background warm-up thread (or on first use), not at import
 service = None
+_ibm_initialized = False
+_ibm_lock = threading.Lock()
+
 def init_ibm_service():
     global service
     if service is not None:  
         return
+    from qiskit_ibm_runtime import QiskitRuntimeService
+
     try:
         if IBM_API_KEY:
             print("Initializing IBM Quantum service...")
@@ -51,10 +83,26 @@ def init_ibm_service():
         print(f"❌ Failed to init IBM service: {e}")
         service = None
 
+def get_ibm_service():
+    """
+    IBM Quantum service, initialized on first use
+
+    :return: QiskitRuntimeService or None if not available
+    """
+    global _ibm_initialized
+    with _ibm_lock:
+        if not _ibm_initialized:
+            with startup_profiler.step("init_ibm_service"):
+                init_ibm_service()
+            _ibm_initialized = True
+    return service
+
 def load_kube_config():
     """
     load kubernetes configuration (in cluster)
     """
+    from kubernetes import config
+
     try:
         # loads service account token
         # kubernetes add the token to access the service account
@@ -66,18 +114,60 @@ def load_kube_config():
     
     except Exception as e:
         print(f"failed to load kube config: {e}")
-        sys.exit(1)
+        raise
+
+k8s_api = None
+_k8s_lock = threading.Lock()
+
+def get_k8s_api():
+    """
+    CustomObjectsApi client, created on first use
+
+    :raises: Exception if the kubernetes config cannot be loaded
+    """
+    global k8s_api
+    with _k8s_lock:
+        if k8s_api is None:
+            with startup_profiler.step("load_kube_config"):
+                from kubernetes import client
+                load_kube_config()
+                k8s_api = client.CustomObjectsApi()
+    return k8s_api
+
+def warm_up():
+    """
+    Create the kubernetes and IBM clients ahead of the first request
+    """
+    try:
+        get_k8s_api()
+    except Exception:
+        # the service cannot create jobs without kubernetes, fail like a failed startup
+        sys.stdout.flush()
+        os._exit(1)
+    get_ibm_service()
+    startup_profiler.print_report("transpiler-service")
 
 
 # Initialize on startup
-init_ibm_service()
-load_kube_config()
-redis_client = RedisDB(redis_host=REDIS_HOST, redis_port=REDIS_PORT)
-k8s_api = client.CustomObjectsApi()
+with startup_profiler.step("init_tracing"):
+    init_tracing("transpiler-service")
+with startup_profiler.step("redis_connect"):
+    redis_client = RedisDB(redis_host=REDIS_HOST, redis_port=REDIS_PORT)
+threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
 print("Initialized Transpiler Service : ✅ ")
 
 
 ##========== HELPER FUNCTIONS =======================
+@contextmanager
+def stage(name):
+    """
+    Time a stage of /transpile as a histogram observation and a span
+
+    :param name: Name of the stage
+    """
+    with timed(TRANSPILER_STAGE_SECONDS, stage=name), span(f"transpiler.{name}"):
+        yield
+
 def deserialize_circuits(circuits_b64):
     """
     Deserialize the base64 encoded quantum circuit
@@ -93,7 +183,248 @@ def deserialize_circuits(circuits_b64):
     except Exception as e:
         raise ValueError(f"Failed to deserialize circuits: {e}")
 
-def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = None):
+def validate_parameter_values(circuits, parameter_values):
+    """
+    Check that every parameterized circuit comes with a matching parameter array
+
+    :param circuits: deserialized circuits
+    :param parameter_values: list of base64 .npy arrays (or None), one per circuit
+    :return: error message, or None if valid
+    """
+    if parameter_values is None:
+        parameter_values = [None] * len(circuits)
+    if len(parameter_values) != len(circuits):
+        return f"Got {len(parameter_values)} parameter arrays for {len(circuits)} circuits"
+
+    for index, (circuit, values_b64) in enumerate(zip(circuits, parameter_values)):
+        if values_b64 is None:
+            if circuit.num_parameters:
+                return f"Circuit {index} has {circuit.num_parameters} unbound parameters"
+            continue
+        values = decode_parameter_values(values_b64)
+        if values.shape[-1:] != (circuit.num_parameters,):
+            return (f"Parameter array of circuit {index} has shape {values.shape}, "
+                    f"expected (..., {circuit.num_parameters})")
+    return None
+
+def validate_isa_parameters(circuits, isa_circuits, parameter_values):
+    """
+    Check that transpilation kept the parameters of the circuits, in order.
+    Parameter arrays are validated against the submitted circuits but bound to
+    the ISA circuits; the columns only line up if both have the same parameters.
+
+    :param circuits: deserialized circuits
+    :param isa_circuits: transpiled circuits
+    :param parameter_values: list of base64 .npy arrays (or None), one per circuit
+    :return: error message, or None if valid
+    """
+    for index, (circuit, isa_circuit, values_b64) in enumerate(
+            zip(circuits, isa_circuits, parameter_values or [None] * len(circuits))):
+        if values_b64 is None:
+            continue
+        submitted = [parameter.name for parameter in circuit.parameters]
+        bound = [parameter.name for parameter in isa_circuit.parameters]
+        if submitted != bound:
+            return (f"Transpiled circuit {index} has parameters {bound}, "
+                    f"the parameter array is ordered as {submitted}")
+    return None
+
+def validate_observables(circuits, observables):
+    """
+    Check that every circuit of an estimator job has observables of its width
+
+    :param circuits: deserialized circuits
+    :param observables: list of encoded observables, one per circuit
+    :return: error message, or None if valid
+    """
+    if not isinstance(observables, list) or len(observables) != len(circuits):
+        return f"Expected one observable entry per circuit ({len(circuits)} circuits)"
+
+    for index, (circuit, encoded) in enumerate(zip(circuits, observables)):
+        for observable in decode_observables(encoded):
+            if observable.num_qubits != circuit.num_qubits:
+                return (f"Observable of circuit {index} acts on {observable.num_qubits} qubits, "
+                        f"circuit has {circuit.num_qubits}")
+    return None
+
+def map_observables(observables, isa_circuits):
+    """
+    Map the observables onto the physical qubits of the transpiled circuits
+
+    :param observables: list of encoded observables, one per circuit
+    :param isa_circuits: transpiled circuits
+    """
+    mapped = []
+    for encoded, isa_circuit in zip(observables, isa_circuits):
+        ops = [op.apply_layout(isa_circuit.layout) for op in decode_observables(encoded)]
+        mapped.append(encode_observables(ops[0] if encoded["scalar"] else ops))
+    return mapped
+
+def count_bindings(parameter_values):
+    """
+    Largest number of parameter bindings of a circuit of the job
+
+    :param parameter_values: list of base64 .npy arrays (or None), one per circuit
+    """
+    bindings = 1
+    for values_b64 in parameter_values or []:
+        if values_b64 is not None:
+            shape = decode_parameter_values(values_b64).shape[:-1]
+            bindings = max(bindings, int(np.prod(shape)))
+    return bindings
+
+def backend_identity(backend_name, backend = None):
+    """
+    Identity of the backend and of its noise snapshot, part of the result cache key
+
+    :param backend_name: Name of the backend.
+    :param backend: IBM backend the noise model is built from (None for aer-simulator).
+    """
+    identity = {"backend": backend_name, "qiskit_aer": qiskit_aer.__version__}
+    if backend is not None:
+        properties = backend.properties()
+        identity["calibrated_at"] = str(properties.last_update_date) if properties else None
+    return identity
+
+def result_cache_key(circuit_hash, shots, identity, simulator_options, parameter_values = None,
+                     estimator = None):
+    """
+    Key of a deterministic job in the result cache
+    
+    :param circuit_hash: canonical hash of the ISA circuits (circuits_hash).
+    :param shots: Number of shots for Sampling.
+    :param identity: backend / noise snapshot identity.
+    :param simulator_options: AerSimulator options, including seed_simulator.
+    :param parameter_values: parameter arrays of parameterized circuits.
+    :param estimator: observables and precision of an estimator job.
+    """
+    return content_hash(json.dumps({
+        "circuit": circuit_hash,
+        "shots": shots,
+        "backend": identity,
+        "options": simulator_options,
+        "parameter_values": parameter_values,
+        "estimator": estimator
+    }, sort_keys=True))
+
+def submission_fingerprint(data, circuits, idempotency_key = None):
+    """
+    Fingerprint of a submission: its idempotency key if the client sent one,
+    otherwise the hash of the circuits and every option affecting the result.
+
+    :param data: JSON body of the /transpile request
+    :param circuits: deserialized circuits, hashed in canonical form (a
+        re-built circuit has another name and parameter uuids in QPY)
+    :param idempotency_key: client supplied idempotency key
+    """
+    if idempotency_key:
+        return content_hash(f"idempotency:{idempotency_key}")
+    return content_hash(json.dumps({
+        "circuits": circuits_hash(circuits),
+        "shots": data.get("shots", 1024),
+        "backend": data.get("backend_name", "aer-simulator"),
+        "options": data.get("simulator_options") or {},
+        "parameter_values": data.get("parameter_values"),
+        "observables": data.get("observables"),
+        "precision": data.get("precision"),
+        "resources": data.get("resources")
+    }, sort_keys=True))
+
+def submission_finished(job_ID, fingerprint, claim_ttl):
+    """
+    Whether the job owning a submission claim is finished. Failed jobs never
+    release their claim: besides a completed / failed status, a job whose CR is
+    gone (deleted ttlSecondsAfterFinished after it ended) is finished.
+
+    :param job_ID: ID of the job owning the claim
+    :param fingerprint: fingerprint of the submission
+    :param claim_ttl: Time to Live the claim was created with
+    """
+    from kubernetes.client.exceptions import ApiException
+
+    try:
+        with timed(K8S_OP_SECONDS, op="get_cr"), span("k8s.get_cr", job_id=job_ID):
+            job = get_k8s_api().get_namespaced_custom_object(
+                group = "aerjob.nav.io",
+                version = "v3",
+                namespace= K8S_NAMESPACE,
+                plural= "quantumaerjobs",
+                name = f"qjob-{job_ID}"
+            )
+        return job.get("status", {}).get("jobStatus") in ("completed", "failed")
+    except ApiException as e:
+        if e.status != 404:
+            # unknown, keep attaching rather than start a duplicate job
+            print(f"❌ Failed to get job status: {e}")
+            return False
+
+    job_data = redis_client.get_job_data(job_id=job_ID)
+    if job_data is not None:
+        # jobs served from the result cache have no CR
+        if job_data.get("status"):
+            return job_data["status"].get("jobStatus") in ("completed", "failed")
+        # the record is written right before the CR is created
+        created_at = calendar.timegm(time.strptime(job_data["created_at"], "%Y-%m-%dT%H:%M:%SZ"))
+        return time.time() - created_at > CR_CREATE_GRACE
+
+    # no record yet: the owner is still being transpiled, unless the claim is
+    # older than any transpilation and the record expired
+    remaining = redis_client.get_inflight_ttl(fingerprint)
+    return remaining is None or claim_ttl - remaining > JOB_TIMEOUT
+
+def claim_submission(fingerprint, job_ID, idempotent = False):
+    """
+    Single-flight: claim the submission for job_ID, unless an identical
+    submission is already in flight.
+
+    :param fingerprint: fingerprint of the submission
+    :param job_ID: ID of the new job
+    :param idempotent: the fingerprint is a client idempotency key, its claim
+        outlives the job (until the TTL) and is never taken over
+    :return: ID of the job that runs the submission
+    """
+    ttl = JOB_TIMEOUT * (MAX_RETRIES + 1)
+    with timed(REDIS_OP_SECONDS, op="claim_inflight"), span("redis.claim_inflight"):
+        owner, claimed = redis_client.claim_inflight(fingerprint, job_ID, ttl=ttl)
+
+    # the previous identical job is finished, this is a new run
+    if not claimed and not idempotent and submission_finished(owner, fingerprint, ttl):
+        with timed(REDIS_OP_SECONDS, op="claim_inflight"), span("redis.claim_inflight"):
+            owner, claimed = redis_client.claim_inflight(fingerprint, job_ID, ttl=ttl,
+                                                         expected_owner=owner)
+    if claimed:
+        INFLIGHT_TOTAL.labels(outcome="claimed").inc()
+        return job_ID
+
+    INFLIGHT_TOTAL.labels(outcome="coalesced").inc()
+    print(f"🔗 Submission already in flight as job {owner}, attaching")
+    return owner
+
+def create_cached_job(job_ID, cache_key, extra_fields = None):
+    """
+    Create an already completed job whose result is served from the result cache.
+    No QuantumJob CR is created.
+
+    :param job_ID: ID of the job.
+    :param cache_key: result cache key holding the result.
+    :param extra_fields: Additional fields stored with the job in redis.
+    """
+    if not job_ID:
+        job_ID = uuid.uuid4().hex[:16]
+
+    with timed(REDIS_OP_SECONDS, op="create_job_data"), span("redis.create_job_data"):
+        redis_client.create_job_data(
+            job_id=job_ID,
+            result_key=cache_key,
+            status={"jobStatus": "completed", "resultCache": "hit"},
+            traceparent=current_traceparent(),
+            **(extra_fields or {})
+        )
+    print(f"♻️ Job {job_ID} served from result cache {cache_key[:12]}")
+    return job_ID
+
+def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = None,
+                       extra_fields = None, circuit_hash = None):
     """
     Creates a QuantumJob Custom Resource in Kuberenets
     
@@ -102,6 +433,8 @@ def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = No
     :param backend_name: Name of the backend.
     :param job_name: Name of the job.
     :param resources: Resource specified.
+    :param extra_fields: Additional fields stored with the job in redis.
+    :param circuit_hash: canonical hash of the circuits, identical circuits share one entry.
     """
     # Generate the ID
 
@@ -110,8 +443,18 @@ def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = No
 
     job_name = f"qjob-{job_ID}"
 
-    redis_client.create_job_data(job_id=job_ID, circuit=circuits_b64)
-    print(f"📝 Stored circuit in DB: {job_ID}")
+    # trace context of the request, picked up by the simulator pod
+    traceparent = current_traceparent()
+
+    # circuits are content addressed, the job record only holds the hash
+    with timed(REDIS_OP_SECONDS, op="put_circuit"), span("redis.put_circuit"):
+        circuit_hash, created = redis_client.put_circuit(circuits_b64, circuit_hash=circuit_hash)
+    CIRCUIT_STORE_TOTAL.labels(outcome="stored" if created else "deduplicated").inc()
+
+    with timed(REDIS_OP_SECONDS, op="create_job_data"), span("redis.create_job_data"):
+        redis_client.create_job_data(job_id=job_ID, circuit_hash=circuit_hash,
+                                     traceparent=traceparent, **(extra_fields or {}))
+    print(f"📝 Stored job in DB: {job_ID} (circuit {circuit_hash[:12]})")
 
     quantum_job_spec = {
         "backendName": backend_name,
@@ -125,6 +468,8 @@ def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = No
 
     if resources:
         quantum_job_spec['resources'] = resources
+    if traceparent:
+        quantum_job_spec['traceParent'] = traceparent
     
     quantum_job = {
         "apiVersion" : "aerjob.nav.io/v3",
@@ -144,12 +489,13 @@ def create_quantum_job(circuits_b64, shots, backend_name, job_ID, resources = No
     print(f"📝 Creating QuantumJob CR: {job_name}")
 
     try:
-        k8s_api.create_namespaced_custom_object(
-            group = "aerjob.nav.io",
-            version = "v3",
-            namespace=K8S_NAMESPACE,
-            plural = "quantumaerjobs",
-            body = quantum_job)
+        with timed(K8S_OP_SECONDS, op="create_cr"), span("k8s.create_cr", job_id=job_ID):
+            get_k8s_api().create_namespaced_custom_object(
+                group = "aerjob.nav.io",
+                version = "v3",
+                namespace=K8S_NAMESPACE,
+                plural = "quantumaerjobs",
+                body = quantum_job)
 
         print(f"✅ QuantumJob {job_name} created")
         return job_name, job_ID
@@ -167,17 +513,25 @@ def get_quantum_job_status(job_ID):
     """    
     job_name = f"qjob-{job_ID}"
     try:
-        job = k8s_api.get_namespaced_custom_object(
-            group = "aerjob.nav.io",
-            version = "v3",
-            namespace= K8S_NAMESPACE,
-            plural= "quantumaerjobs",
-            name = job_name
-        )
+        with timed(K8S_OP_SECONDS, op="get_cr"), span("k8s.get_cr", job_id=job_ID):
+            job = get_k8s_api().get_namespaced_custom_object(
+                group = "aerjob.nav.io",
+                version = "v3",
+                namespace= K8S_NAMESPACE,
+                plural= "quantumaerjobs",
+                name = job_name
+            )
 
         return job.get("status", {})
     
     except Exception as e:
+        # jobs served from the result cache have no CR
+        try:
+            job_data = redis_client.get_job_data(job_id=job_ID)
+            if job_data and job_data.get("status"):
+                return job_data["status"]
+        except Exception:
+            pass
         print(f"❌ Failed to get job status: {e}")
         return {}
     
@@ -191,7 +545,7 @@ def delete_quantum_job(job_name):
     """
 
     try:
-        k8s_api.delete_namespaced_custom_object(
+        get_k8s_api().delete_namespaced_custom_object(
             group = "aerjob.nav.io",
             version = "v3",
             namespace= K8S_NAMESPACE,
@@ -201,6 +555,30 @@ def delete_quantum_job(job_name):
         print(f"🗑️ job {job_name} has been deleted.")
     except Exception as e:
         print(f"⚠️ failed to delete the job {job_name}: {e}")
+
+
+def count_active_jobs():
+    """
+    Count QuantumJob CRs created by this service that are not yet finished.
+    Evaluated lazily on every scrape of /metrics.
+    """
+    try:
+        jobs = get_k8s_api().list_namespaced_custom_object(
+            group = "aerjob.nav.io",
+            version = "v3",
+            namespace= K8S_NAMESPACE,
+            plural= "quantumaerjobs",
+            label_selector = "managed-by=transpiler-service"
+        )
+        return sum(
+            1 for job in jobs.get("items", [])
+            if job.get("status", {}).get("jobStatus") not in ("completed", "failed")
+        )
+    except Exception as e:
+        print(f"⚠️ failed to count active jobs: {e}")
+        return float("nan")
+
+QUEUE_DEPTH.set_function(count_active_jobs)
     
 ##=========== ENDPOINTS =============================
 @app.route("/health")
@@ -211,49 +589,211 @@ def health():
         "ibm_available": service is not None
     })
 
+@app.route("/metrics")
+def metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
 @app.route("/transpile", methods=["POST"])
 def transpile():
 
-    try:
-        data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+    with span("transpiler.transpile", carrier=request.headers, job_id=data.get("job_id")):
+        return _transpile(data, idempotency_key)
+
+def _transpile(data, idempotency_key = None):
+    """
+    Transpile the submitted circuits and create the QuantumJob CR
 
+    :param data: JSON body of the /transpile request
+    :param idempotency_key: client supplied idempotency key
+    """
+    fingerprint = None
+    try:
         # decode the circuit
         circuits_b64 = data.get('circuits_qpy')
         shots = data.get("shots", 1024)
         backend_name = data.get("backend_name", "aer-simulator")
         job_id = data.get("job_id", None)
         resources = data.get('resources', None)
+        profile = data.get('profile', False)
+        profile_memory = data.get('profile_memory', False)
+        simulator_options = data.get('simulator_options') or {}
+        cache_results = data.get('cache_results', False)
+        coalesce = data.get('coalesce', True)
+        # parameterized circuits are transpiled once, bound by the simulator
+        parameter_values = data.get('parameter_values')
+        # estimator jobs return expectation values of the observables, not shots
+        observables = data.get('observables')
+        precision = float(data.get('precision') or 0.0)
 
         if not circuits_b64:
             return jsonify({"Transpiler error": "No circuits provided"}), 400
-        
-        circuits = deserialize_circuits(circuits_b64)
+
+        PAYLOAD_BYTES.labels(kind="circuits_qpy").set(len(circuits_b64))
+        with stage("deserialize"):
+            circuits = deserialize_circuits(circuits_b64)
+
+        # identical submissions attach to the in-flight job instead of
+        # transpiling and simulating again
+        job_id = job_id or uuid.uuid4().hex[:16]
+        if coalesce or idempotency_key:
+            fingerprint = submission_fingerprint(data, circuits, idempotency_key)
+            owner_job_id = claim_submission(fingerprint, job_id, idempotent=bool(idempotency_key))
+            if owner_job_id != job_id:
+                fingerprint = None  # owned by the other job, never release it
+                return jsonify({
+                    "status" : "accepted",
+                    "job_id" : owner_job_id,
+                    "coalesced" : True,
+                    "error" : "",
+                    "message": f"Identical job in flight. Poll /job/{owner_job_id}/status for updates"
+                }), 202
+
+        parameter_error = validate_parameter_values(circuits, parameter_values)
+        if observables is not None and not parameter_error:
+            parameter_error = validate_observables(circuits, observables)
+        if parameter_error:
+            if fingerprint:
+                redis_client.release_inflight(fingerprint, job_id)
+            return jsonify({"Transpiler error": parameter_error}), 400
     
-        
-        if backend_name == "aer-simulator" or not service:
-            target = AerSimulator().target    
-        else:
-            target = service.backend(name=backend_name).target
+        if observables is not None:
+            # expectation values are computed on the final state
+            circuits = [circuit.remove_final_measurements(inplace=False) for circuit in circuits]
+
+        with stage("target_lookup"):
+            ibm_service = None if backend_name == "aer-simulator" else get_ibm_service()
+            if ibm_service is None:
+                backend = None
+                target = AerSimulator().target    
+            else:
+                backend = ibm_service.backend(name=backend_name)
+                target = backend.target
          
-        pm = generate_preset_pass_manager(optimization_level=3, target=target)
-        isa_circuits = pm.run(circuits)
+        with stage("pass_manager_run"):
+            seed_transpiler = simulator_options.get("seed_simulator", TRANSPILER_SEED)
+            pm = generate_preset_pass_manager(optimization_level=3, target=target,
+                                              seed_transpiler=seed_transpiler)
+            if profile or profile_memory:
+                # circuits run one by one so that the callback sees every pass
+                profiler = PassProfiler(pm, track_memory=profile_memory)
+                isa_circuits, profiles = [], []
+                for circuit in circuits:
+                    isa_circuit, circuit_profile = profiler.run(circuit)
+                    isa_circuits.append(isa_circuit)
+                    profiles.append(circuit_profile)
+            else:
+                profiles = None
+                isa_circuits = pm.run(circuits)
+
+        # the values are bound to the ISA circuits, their columns must still match
+        parameter_error = validate_isa_parameters(circuits, isa_circuits, parameter_values)
+        if parameter_error:
+            if fingerprint:
+                redis_client.release_inflight(fingerprint, job_id)
+            return jsonify({"Transpiler error": parameter_error}), 400
 
         # serialize the circuit
-        with io.BytesIO() as fptr:
-            qpy.dump(isa_circuits, fptr)
-            isa_circuit_bytes = fptr.getvalue()
-            isa_circuit_b64 = base64.b64encode(isa_circuit_bytes).decode("utf-8")
+        with stage("serialize"):
+            with io.BytesIO() as fptr:
+                qpy.dump(isa_circuits, fptr)
+                isa_circuit_bytes = fptr.getvalue()
+                isa_circuit_b64 = base64.b64encode(isa_circuit_bytes).decode("utf-8")
+        PAYLOAD_BYTES.labels(kind="isa_circuits_qpy").set(len(isa_circuit_b64))
+        # QPY embeds circuit names and parameter uuids, identical circuits
+        # built twice are only equal in canonical form
+        isa_circuits_hash = circuits_hash(isa_circuits)
+
+        # size the simulator pod, jobs that can never fit are rejected here
+        # instead of being OOM-killed and retried by the operator
+        sizing_options = dict(simulator_options)
+        if observables is not None and backend_name == "aer-simulator":
+            # exact expectation values run on the statevector method
+            sizing_options.setdefault("method", "statevector")
+        try:
+            sizing = estimate_resources(isa_circuits, shots, sizing_options,
+                                        noisy=backend_name != "aer-simulator",
+                                        bindings=count_bindings(parameter_values))
+        except ResourceError as e:
+            SIZING_TOTAL.labels(outcome="rejected").inc()
+            if fingerprint:
+                redis_client.release_inflight(fingerprint, job_id)
+            return jsonify({"Transpiler error": str(e)}), 400
+        SIZING_TOTAL.labels(outcome="sized").inc()
+        print(f"📐 Estimated resources: {sizing['estimate']}")
+        resources = merge_resources(sizing["resources"], resources)
+
+        # thread / memory settings do not change results, kept out of the cache key
+        extra_fields = {"simulator_options": {**sizing["simulator_options"], **simulator_options}}
+        if parameter_values:
+            extra_fields["parameter_values"] = parameter_values
+        estimator = None
+        if observables is not None:
+            estimator = {
+                "observables": map_observables(observables, isa_circuits),
+                "precision": precision
+            }
+            extra_fields["estimator"] = estimator
+        if profiles:
+            extra_fields["profile"] = profiles
+
+        # only seeded jobs and exact (noiseless, zero precision) expectation
+        # values are deterministic, and therefore cacheable
+        exact = estimator is not None and backend_name == "aer-simulator" and precision == 0
+        if cache_results and ("seed_simulator" in simulator_options or exact):
+            cache_key = result_cache_key(isa_circuits_hash, shots,
+                                         backend_identity(backend_name, backend), simulator_options,
+                                         parameter_values, estimator)
+            with timed(REDIS_OP_SECONDS, op="lookup_cached_result"), span("redis.lookup_cached_result"):
+                cache_hit = redis_client.lookup_cached_result(cache_key)
+            RESULT_CACHE_TOTAL.labels(outcome="hit" if cache_hit else "miss").inc()
+
+            if cache_hit:
+                job_id = create_cached_job(job_id, cache_key, extra_fields)
+                if fingerprint and not idempotency_key:
+                    # completed already, nothing in flight
+                    redis_client.release_inflight(fingerprint, job_id)
+                response = {
+                    "status" : "completed",
+                    "job_id" : job_id,
+                    "error" : "",
+                    "message": f"Result served from cache. Fetch /job/{job_id}/result"
+                }
+                if profiles:
+                    response["profile"] = profiles
+                return jsonify(response), 202
+
+            # the simulator stores the result under the key once it completes
+            extra_fields["result_cache"] = {
+                "key": cache_key,
+                "ttl": RESULT_CACHE_TTL,
+                "max_entries": RESULT_CACHE_MAX_ENTRIES
+            }
 
-        job_name, job_id = create_quantum_job(isa_circuit_b64, shots, backend_name, job_id, resources)
+        if fingerprint and not idempotency_key:
+            # released by the simulator once the result is written, idempotency
+            # keys keep returning this job until their claim expires
+            extra_fields["inflight_key"] = fingerprint
+        job_name, job_id = create_quantum_job(isa_circuit_b64, shots, backend_name, job_id, resources,
+                                              extra_fields, isa_circuits_hash)
 
-        return jsonify({
+        response = {
             "status" : "accepted",
             "job_id" :  job_id, 
             "error" : "",
             "message": f"Job submitted. Poll /job/{job_id}/status for updates"
-             }), 202  
+             }
+        if profiles:
+            response["profile"] = profiles
+        return jsonify(response), 202  
 
     except Exception as e:
+        if fingerprint:
+            try:
+                redis_client.release_inflight(fingerprint, job_id)
+            except Exception:
+                pass
         return jsonify({
             "status": "failed",
             "job_id": "",
@@ -271,7 +811,8 @@ def get_job_status_endpoint(job_ID):
     Useful for async polling if needed
     """
     try:
-        status = get_quantum_job_status(job_ID)
+        with span("transpiler.job_status", carrier=request.headers, job_id=job_ID):
+            status = get_quantum_job_status(job_ID)
 
         # function returns empty, JOB doesnot exists
         if not status:
@@ -293,7 +834,8 @@ def get_job_result_endpoint(job_ID):
     Get the result of a completed QuantumJob
     """
     try:
-        status = get_quantum_job_status(job_ID)
+        with span("transpiler.job_result", carrier=request.headers, job_id=job_ID):
+            status = get_quantum_job_status(job_ID)
         
         if status.get("jobStatus") != "completed":
             return jsonify({
@@ -302,10 +844,19 @@ def get_job_result_endpoint(job_ID):
             }), 400
         
         # result_b64 = status.get("result", "")
-        job_data = redis_client.get_job_data(job_id=job_ID)
+        with timed(REDIS_OP_SECONDS, op="get_job_data"), \
+                span("redis.get_job_data", carrier=request.headers, job_id=job_ID):
+            job_data = redis_client.get_job_data(job_id=job_ID)
+        result_b64 = job_data.get("results",None)
+        if result_b64 is None and job_data.get("result_key"):
+            with timed(REDIS_OP_SECONDS, op="get_cached_result"):
+                result_b64 = redis_client.get_cached_result(job_data["result_key"])
+            if result_b64 is None:
+                return jsonify({"error": f"Cached result of job {job_ID} has been evicted"}), 404
+        PAYLOAD_BYTES.labels(kind="result").set(len(result_b64 or ""))
         return jsonify({
             "status": "success",
-            "result": job_data.get("results",None)
+            "result": result_b64
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 404
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import json
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterExpression
+from qiskit.circuit.library import get_standard_gate_name_mapping
+
+STANDARD_GATES = set(get_standard_gate_name_mapping())
+
+
+def _canonical_param(param):
+    """
+    JSON-friendly, exact form of an instruction parameter
+    """
+    if isinstance(param, QuantumCircuit):
+        # blocks of control flow operations
+        return canonical_form(param)
+    if isinstance(param, ParameterExpression):
+        # by name: parameters of two builds of a circuit have different uuids
+        return f"expr:{param}"
+    if isinstance(param, np.ndarray):
+        return {"dtype": str(param.dtype), "shape": list(param.shape),
+                "data": base64.b64encode(np.ascontiguousarray(param).tobytes()).decode("utf-8")}
+    return repr(param)
+
+
+def canonical_form(circuit):
+    """
+    Canonical form of a circuit: everything that affects its results, without
+    the name, metadata and parameter uuids that QPY embeds. Two builds of the
+    same circuit have the same canonical form.
+
+    :param circuit: QuantumCircuit
+    :return: JSON-serializable dict
+    """
+    data = []
+    for instruction in circuit.data:
+        operation = instruction.operation
+        entry = [
+            operation.name,
+            [_canonical_param(param) for param in operation.params],
+            [circuit.find_bit(qubit).index for qubit in instruction.qubits],
+            [circuit.find_bit(clbit).index for clbit in instruction.clbits]
+        ]
+        # custom gates are only known by their name, compare their definition
+        if operation.name not in STANDARD_GATES and getattr(operation, "definition", None) is not None:
+            entry.append(canonical_form(operation.definition))
+        data.append(entry)
+
+    layout = circuit.layout
+    return {
+        "num_qubits": circuit.num_qubits,
+        "num_clbits": circuit.num_clbits,
+        "global_phase": _canonical_param(circuit.global_phase),
+        # classical register names are the data fields of sampler results
+        "cregs": [[creg.name, creg.size] for creg in circuit.cregs],
+        "layout": layout.final_index_layout() if layout is not None else None,
+        "data": data
+    }
+
+
+def circuits_hash(circuits):
+    """
+    SHA-256 of the canonical form of circuits, identical for identical
+    circuits built separately (unlike the hash of their QPY serialization)
+
+    :param circuits: list of QuantumCircuit
+    """
+    canonical = json.dumps([canonical_form(circuit) for circuit in circuits],
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
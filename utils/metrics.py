@@ -0,0 +1,148 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    push_to_gateway,
+)
+
+# buckets span sub-millisecond redis calls up to multi-minute simulations
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+
+
+##============= TRANSPILER SERVICE ==============
+# registered in the default registry, exposed on /metrics
+
+TRANSPILER_STAGE_SECONDS = Histogram(
+    "transpiler_stage_seconds",
+    "Wall time of each stage of a /transpile request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+REDIS_OP_SECONDS = Histogram(
+    "transpiler_redis_op_seconds",
+    "Wall time of Redis operations issued by the transpiler service",
+    ["op"],
+    buckets=LATENCY_BUCKETS
+)
+
+K8S_OP_SECONDS = Histogram(
+    "transpiler_k8s_op_seconds",
+    "Wall time of QuantumAerJob CR operations issued by the transpiler service",
+    ["op"],
+    buckets=LATENCY_BUCKETS
+)
+
+PASS_SECONDS = Histogram(
+    "transpiler_pass_seconds",
+    "Wall time of individual transpiler passes (profiled requests only)",
+    ["pass_name", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+QUEUE_DEPTH = Gauge(
+    "transpiler_queue_depth",
+    "Number of QuantumAerJob CRs that are not yet completed or failed"
+)
+
+CIRCUIT_STORE_TOTAL = Counter(
+    "transpiler_circuit_store_total",
+    "ISA circuits written to the content-addressed store, by outcome",
+    ["outcome"]
+)
+
+RESULT_CACHE_TOTAL = Counter(
+    "transpiler_result_cache_total",
+    "Result cache lookups of deterministic (seeded) jobs, by outcome",
+    ["outcome"]
+)
+
+INFLIGHT_TOTAL = Counter(
+    "transpiler_inflight_submissions_total",
+    "Submissions that started a new job vs. attached to an identical in-flight job",
+    ["outcome"]
+)
+
+SIZING_TOTAL = Counter(
+    "transpiler_sizing_total",
+    "Pre-flight resource estimates of jobs, sized vs. rejected as too large",
+    ["outcome"]
+)
+
+PAYLOAD_BYTES = Gauge(
+    "transpiler_payload_bytes",
+    "Size in bytes of the most recent payload of each kind",
+    ["kind"]
+)
+
+
+##============= SIMULATOR ==============
+# simulator pods are short lived, so their metrics live in a dedicated
+# registry that is pushed to a Pushgateway at the end of each job.
+
+SIMULATOR_REGISTRY = CollectorRegistry()
+
+SIMULATOR_STAGE_SECONDS = Histogram(
+    "simulator_stage_seconds",
+    "Wall time of each stage of a simulator job",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=SIMULATOR_REGISTRY
+)
+
+SIMULATOR_CHUNKS_TOTAL = Counter(
+    "simulator_shot_chunks_total",
+    "Shot chunks of checkpointed jobs, simulated vs. resumed from a checkpoint",
+    ["outcome"],
+    registry=SIMULATOR_REGISTRY
+)
+
+
+@contextmanager
+def timed(histogram, record=None, **labels):
+    """
+    Observe the wall time of the enclosed block on a histogram
+
+    :param histogram: Prometheus histogram to observe.
+    :param record: Optional dict, elapsed seconds is stored under the label value(s).
+    :param labels: Label values of the histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.labels(**labels).observe(elapsed)
+        if record is not None:
+            record[":".join(labels.values())] = round(elapsed, 6)
+
+
+def push_simulator_metrics(backend_name):
+    """
+    Push simulator metrics to the Pushgateway (if configured).
+    The Pushgateway never expires groups: metrics are grouped per backend,
+    not per job, per-job timings are stored with the job in redis.
+
+    :param backend_name: Name of the backend, used as grouping key.
+    """
+    gateway = os.getenv("PUSHGATEWAY_URL")
+    if not gateway:
+        return
+    try:
+        push_to_gateway(
+            gateway,
+            job="aer-simulator",
+            grouping_key={"backend": backend_name or "unknown"},
+            registry=SIMULATOR_REGISTRY
+        )
+        print(f"📈 Pushed simulator metrics to {gateway}")
+    except Exception as e:
+        print(f"⚠️ Failed to push simulator metrics: {e}")
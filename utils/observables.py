@@ -0,0 +1,49 @@
+from qiskit.quantum_info import SparsePauliOp
+
+
+def encode_observables(observables):
+    """
+    Encode the observables of one circuit as JSON-friendly Pauli terms
+
+    :param observables: observable (SparsePauliOp, Pauli or label) or a list of them
+    :return: {"terms": [[[label, re, im], ...], ...], "scalar": bool}
+    """
+    scalar = not isinstance(observables, (list, tuple))
+    if scalar:
+        observables = [observables]
+
+    terms = []
+    for observable in observables:
+        op = SparsePauliOp(observable) if not isinstance(observable, SparsePauliOp) else observable
+        terms.append([[label, float(coeff.real), float(coeff.imag)]
+                      for label, coeff in op.to_list()])
+    return {"terms": terms, "scalar": scalar}
+
+
+def decode_observables(encoded):
+    """
+    Decode observables encoded by encode_observables
+
+    :param encoded: {"terms": ..., "scalar": bool}
+    :return: list of SparsePauliOp
+    """
+    return [
+        SparsePauliOp.from_list([(label, complex(re, im)) for label, re, im in observable])
+        for observable in encoded["terms"]
+    ]
+
+
+def estimator_observables(encoded, parameterized = False):
+    """
+    Observables of an EstimatorV2 PUB, shaped to broadcast with its parameter array
+
+    :param encoded: {"terms": ..., "scalar": bool}
+    :param parameterized: the PUB carries a parameter array
+    """
+    observables = decode_observables(encoded)
+    if encoded["scalar"]:
+        return observables[0]
+    if parameterized:
+        # (num_observables, 1) x (num_bindings,) -> (num_observables, num_bindings)
+        return [[observable] for observable in observables]
+    return observables
@@ -0,0 +1,25 @@
+import base64
+import io
+
+import numpy as np
+
+
+def encode_parameter_values(values):
+    """
+    Encode a parameter-value array as base64 .npy (compact binary, keeps the shape)
+
+    :param values: array-like, last axis indexes the circuit parameters
+    """
+    with io.BytesIO() as fptr:
+        np.save(fptr, np.asarray(values, dtype=np.float64), allow_pickle=False)
+        return base64.b64encode(fptr.getvalue()).decode("utf-8")
+
+
+def decode_parameter_values(values_b64):
+    """
+    Decode a parameter-value array encoded by encode_parameter_values
+
+    :param values_b64: base64 encoded .npy bytes
+    """
+    with io.BytesIO(base64.b64decode(values_b64)) as fptr:
+        return np.load(fptr, allow_pickle=False)
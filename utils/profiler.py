@@ -0,0 +1,130 @@
+import threading
+import time
+import tracemalloc
+
+from qiskit.converters import circuit_to_dag
+
+from utils.metrics import PASS_SECONDS
+
+# tracemalloc is process-global: memory-profiled runs of concurrent requests
+# (flask threads) are serialized, one of them stopping it would end the others
+_TRACEMALLOC_LOCK = threading.Lock()
+
+
+def dag_stats(dag):
+    """
+    Size statistics of a circuit DAG
+
+    :param dag: DAGCircuit
+    :return: dict with size, depth and two-qubit gate count
+    """
+    return {
+        "size": dag.size(),
+        "depth": dag.depth(),
+        "two_qubit_gates": len(dag.two_qubit_ops())
+    }
+
+
+class PassProfiler:
+    """
+    Records per-pass wall time (and optionally peak memory) of a staged
+    pass manager run, along with circuit statistics before and after each stage.
+    """
+
+    def __init__(self, pm, track_memory = False):
+        """
+        :param pm: StagedPassManager (e.g. from generate_preset_pass_manager)
+        :param track_memory: record peak traced memory of every pass (slower).
+            Memory-profiled runs are serialized across threads; the peaks also
+            include allocations of unprofiled requests running concurrently.
+        """
+        self.pm = pm
+        self.track_memory = track_memory
+        self._stage_of = self._index_stages(pm)
+
+    @staticmethod
+    def _index_stages(pm):
+        """
+        Map every pass instance of the pass manager to the stage it belongs to
+        """
+        stage_of = {}
+        stages = getattr(pm, "expanded_stages", None) or getattr(pm, "stages", ())
+        for stage in stages:
+            stage_pm = getattr(pm, stage, None)
+            if stage_pm is None:
+                continue
+            pending = [stage_pm.to_flow_controller()]
+            while pending:
+                task = pending.pop()
+                children = getattr(task, "tasks", None)
+                if children is not None:
+                    pending.extend(children)
+                else:
+                    stage_of.setdefault(id(task), stage)
+        return stage_of
+
+    def run(self, circuit):
+        """
+        Transpile a single circuit while profiling it
+
+        :param circuit: QuantumCircuit
+        :return: (transpiled circuit, profile dict)
+        """
+        self._passes = []
+        self._stages = []
+        self._last_stats = dag_stats(circuit_to_dag(circuit))
+        self._current = None
+
+        if self.track_memory:
+            _TRACEMALLOC_LOCK.acquire()
+            tracemalloc.start()
+            self._mem_baseline = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            isa_circuit = self.pm.run(circuit, callback=self._callback)
+        finally:
+            total = time.perf_counter() - start
+            if self.track_memory:
+                tracemalloc.stop()
+                _TRACEMALLOC_LOCK.release()
+
+        if self._current is not None:
+            self._current["after"] = self._last_stats
+            self._stages.append(self._current)
+
+        return isa_circuit, {
+            "total_seconds": round(total, 6),
+            "stages": self._stages,
+            "passes": self._passes
+        }
+
+    def _callback(self, **kwargs):
+        """
+        Pass manager callback, invoked after every executed pass
+        """
+        pass_ = kwargs["pass_"]
+        elapsed = kwargs["time"]
+        name = type(pass_).__name__
+        stage = self._stage_of.get(id(pass_), "unknown")
+
+        record = {"pass": name, "stage": stage, "seconds": round(elapsed, 6)}
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record["peak_memory_kib"] = round(max(peak - self._mem_baseline, 0) / 1024, 1)
+
+        # stage boundary: the previous stage ends with the stats of its last pass
+        if self._current is None or self._current["stage"] != stage:
+            if self._current is not None:
+                self._current["after"] = self._last_stats
+                self._stages.append(self._current)
+            self._current = {"stage": stage, "seconds": 0.0, "before": self._last_stats}
+
+        self._current["seconds"] = round(self._current["seconds"] + elapsed, 6)
+        self._last_stats = dag_stats(kwargs["dag"])
+        self._passes.append(record)
+        PASS_SECONDS.labels(pass_name=name, stage=stage).observe(elapsed)
+
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            self._mem_baseline = tracemalloc.get_traced_memory()[0]
@@ -2,6 +2,74 @@ import redis
 import os
 import time
 import json
+import hashlib
+import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    # zlib is always available
+    zstandard = None
+
+# Values above COMPRESS_THRESHOLD bytes are compressed, values still above
+# CHUNK_SIZE bytes are split into chunk keys and the main key holds a manifest.
+# Stored values start with a 3-byte header; plain JSON / base64 values
+# (as written before compression) never start with a NUL byte.
+ZLIB_HEADER = b"\x00zl"
+ZSTD_HEADER = b"\x00zs"
+CHUNKED_HEADER = b"\x00ch"
+HEADER_SIZE = 3
+
+COMPRESS_THRESHOLD = int(os.getenv("REDIS_COMPRESS_THRESHOLD", str(64 * 1024)))
+CHUNK_SIZE = int(os.getenv("REDIS_CHUNK_SIZE", str(1024 * 1024)))
+# chunks read / written per round trip
+CHUNK_BATCH = 8
+
+
+def content_hash(payload):
+    """
+    SHA-256 hex digest of a serialized payload (str)
+    """
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compress_value(value):
+    """
+    Compress a value above COMPRESS_THRESHOLD, prefixed with its codec header
+
+    :param value: bytes
+    """
+    if len(value) < COMPRESS_THRESHOLD:
+        return value
+    if zstandard is not None:
+        return ZSTD_HEADER + zstandard.ZstdCompressor(level=3).compress(value)
+    return ZLIB_HEADER + zlib.compress(value, 1)
+
+
+def _decompressor(header):
+    """
+    Streaming decompressor for a codec header (None for uncompressed values)
+    """
+    if header == ZSTD_HEADER:
+        if zstandard is None:
+            raise RuntimeError("Value is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if header == ZLIB_HEADER:
+        return zlib.decompressobj()
+    return None
+
+
+def decompress_value(value):
+    """
+    Inverse of compress_value
+
+    :param value: bytes
+    """
+    decompressor = _decompressor(value[:HEADER_SIZE])
+    if decompressor is None:
+        return value
+    return decompressor.decompress(value[HEADER_SIZE:]) + decompressor.flush()
 
 
 class RedisDB:
@@ -30,9 +98,131 @@ class RedisDB:
         except Exception as e:
             print(f"❌ Failed to intialize Redis service")
             raise
+
+    def _write(self, key, value, ttl, nx = False):
+        """
+        Write a value, compressed and chunked depending on its size
+        
+        :param key: Redis key
+        :param value: str or bytes
+        :param ttl: Time to Live
+        :param nx: only write if the key does not exist
+        :return: True if written
+        """
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        # deduplicated writes never upload a payload that is already stored
+        if nx and self.client.exists(key):
+            return False
+        payload = compress_value(value)
+
+        # chunks of the value being replaced, deleted once the new value is set
+        previous_chunks = [] if nx else self._chunk_keys(key)
+
+        if len(payload) <= CHUNK_SIZE:
+            written = bool(self.client.set(key, payload, ex = ttl, nx = nx))
+            if written and previous_chunks:
+                self.client.delete(*previous_chunks)
+            return written
+
+        # concurrent NX writers of the same key: only the one owning the
+        # claim uploads its chunks
+        claim_key = f"writing:{key}"
+        if nx and not self.client.set(claim_key, 1, ex = ttl, nx = True):
+            return False
+
+        try:
+            # chunks are versioned, readers never mix chunks of two writes
+            prefix = f"chunk:{key}:{uuid.uuid4().hex[:8]}"
+            chunk_keys = []
+            for start in range(0, len(payload), CHUNK_SIZE * CHUNK_BATCH):
+                pipe = self.client.pipeline(transaction = False)
+                for offset in range(start, min(start + CHUNK_SIZE * CHUNK_BATCH, len(payload)), CHUNK_SIZE):
+                    chunk_key = f"{prefix}:{len(chunk_keys)}"
+                    pipe.set(chunk_key, payload[offset:offset + CHUNK_SIZE], ex = ttl)
+                    chunk_keys.append(chunk_key)
+                pipe.execute()
+
+            manifest = CHUNKED_HEADER + json.dumps({
+                "prefix": prefix,
+                "chunks": len(chunk_keys),
+                "size": len(payload)
+            }).encode("utf-8")
+            if self.client.set(key, manifest, ex = ttl, nx = nx):
+                if previous_chunks:
+                    self.client.delete(*previous_chunks)
+                return True
+            self.client.delete(*chunk_keys)
+            return False
+        finally:
+            if nx:
+                self.client.delete(claim_key)
+
+    def _chunk_keys(self, key):
+        """
+        Chunk keys of a chunked value (empty list otherwise)
+        """
+        # the header alone tells whether the value is a manifest
+        if self.client.getrange(key, 0, HEADER_SIZE - 1) != CHUNKED_HEADER:
+            return []
+        manifest = json.loads(self.client.get(key)[HEADER_SIZE:])
+        return [f"{manifest['prefix']}:{i}" for i in range(manifest["chunks"])]
+
+    def _read(self, key):
+        """
+        Read a value written by _write, streaming chunks back and decompressing them
+        
+        :param key: Redis key
+        :return: bytes or None if not found
+        """
+        data = self.client.get(key)
+        if data is None or not data.startswith(CHUNKED_HEADER):
+            return None if data is None else decompress_value(data)
+
+        manifest = json.loads(data[HEADER_SIZE:])
+        chunk_keys = [f"{manifest['prefix']}:{i}" for i in range(manifest["chunks"])]
+
+        parts = []
+        decompressor = None
+        for start in range(0, len(chunk_keys), CHUNK_BATCH):
+            pipe = self.client.pipeline(transaction = False)
+            for chunk_key in chunk_keys[start:start + CHUNK_BATCH]:
+                pipe.get(chunk_key)
+            for chunk in pipe.execute():
+                if chunk is None:
+                    raise ValueError(f"Chunk of {key} has expired")
+                if not parts and decompressor is None:
+                    decompressor = _decompressor(chunk[:HEADER_SIZE])
+                    if decompressor is not None:
+                        chunk = chunk[HEADER_SIZE:]
+                parts.append(decompressor.decompress(chunk) if decompressor else chunk)
+        if decompressor is not None:
+            parts.append(decompressor.flush())
+        return b"".join(parts)
+
+    def _delete(self, key):
+        """
+        Delete a value and its chunks
+        
+        :return: number of deleted (main) keys
+        """
+        chunk_keys = self._chunk_keys(key)
+        if chunk_keys:
+            self.client.delete(*chunk_keys)
+        return self.client.delete(key)
+
+    def _extend_ttl(self, key, ttl):
+        """
+        Extend (never shorten) the TTL of a value and its chunks
+        """
+        pipe = self.client.pipeline(transaction = False)
+        for k in [key] + self._chunk_keys(key):
+            pipe.expire(k, ttl, gt = True)
+        pipe.execute()
     
     def create_job_data(self, job_id, circuit = None, 
-                    results = None, ttl = 1200):
+                    results = None, ttl = 1200, **extra_fields):
         """
         Create job data object in redis DB
         
@@ -40,6 +230,7 @@ class RedisDB:
         :param circuit: quantum circuit (serialized)
         :param results: serialized results
         :param ttl: Time to Live
+        :param extra_fields: additional JSON-serializable fields stored with the job
         :return: Created job data dictionary
         :raises: Exception if Redis operation fails
         """
@@ -52,13 +243,10 @@ class RedisDB:
             "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),  
             "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         }
+        job_data.update(extra_fields)
 
         try:
-            self.client.setex(
-                job_key,
-                ttl,
-                json.dumps(job_data)
-            )
+            self._write(job_key, json.dumps(job_data), ttl)
             print("✅ Created job data in redis")
             return job_data
         except Exception as e:
@@ -77,7 +265,7 @@ class RedisDB:
         job_key = f"job:{job_id}"
 
         try:
-            data = self.client.get(job_key)
+            data = self._read(job_key)
 
             if not data:
                 print(f"Job data not found : {job_id}")
@@ -112,11 +300,7 @@ class RedisDB:
         job_data["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
         try:
-            self.client.setex(
-                job_key,
-                ttl,
-                json.dumps(job_data)
-            )
+            self._write(job_key, json.dumps(job_data), ttl)
         
         except Exception as e:
             print("❌ Failed to update the job data")
@@ -134,7 +318,7 @@ class RedisDB:
         job_key = f"job:{job_id}"
 
         try:
-            result = self.client.delete(job_key)
+            result = self._delete(job_key)
             if result:
                 print(f"✅ Deleted job data: {job_id}")
                 return True
@@ -146,6 +330,298 @@ class RedisDB:
             print(f"Failed to fetch job data: {e}")
             raise
 
+    def put_circuit(self, circuit, ttl = 1200, circuit_hash = None):
+        """
+        Store a serialized circuit once under its content hash
+        
+        Identical circuits submitted by different jobs share one entry, its
+        TTL is only ever extended so it outlives every job referencing it.
+
+        :param circuit: quantum circuit (serialized)
+        :param ttl: Time to Live
+        :param circuit_hash: hash of the canonical form of the circuits
+            (utils.circuits.circuits_hash), the hash of the payload if None
+        :return: (content hash of the circuit, True if newly stored)
+        :raises: Exception if Redis operation fails
+        """
+
+        circuit_hash = circuit_hash or content_hash(circuit)
+        circuit_key = f"circuit:{circuit_hash}"
+
+        try:
+            created = self._write(circuit_key, circuit, ttl, nx = True)
+            if not created:
+                self._extend_ttl(circuit_key, ttl)
+            if created:
+                print(f"✅ Stored circuit {circuit_hash[:12]}")
+            else:
+                print(f"♻️ Circuit {circuit_hash[:12]} already stored, TTL refreshed")
+            return circuit_hash, bool(created)
+        except Exception as e:
+            print(f"❌ Failed to store circuit: {e}")
+            raise
+
+    def get_circuit(self, circuit_hash):
+        """
+        Fetch a serialized circuit by its content hash
+
+        :param circuit_hash: content hash returned by put_circuit
+        :return: serialized circuit or None if not found
+        :raises: Exception if Redis operation fails
+        """
+
+        circuit_key = f"circuit:{circuit_hash}"
+
+        try:
+            data = self._read(circuit_key)
+            if not data:
+                print(f"Circuit not found : {circuit_hash}")
+                return None
+            return data.decode("utf-8")
+        except Exception as e:
+            print(f"❌ Failed to fetch the circuit: {e}")
+            raise
+
+    def lookup_cached_result(self, cache_key):
+        """
+        Check the result cache, marking the entry as recently used on a hit
+
+        :param cache_key: result cache key
+        :return: True if a result is cached under the key
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            if self.client.exists(f"result:{cache_key}"):
+                self.client.zadd("result_cache:lru", {cache_key: time.time()})
+                return True
+            # entry expired, drop it from the LRU index
+            self.client.zrem("result_cache:lru", cache_key)
+            return False
+        except Exception as e:
+            print(f"❌ Failed to look up the result cache: {e}")
+            raise
+
+    def get_cached_result(self, cache_key):
+        """
+        Fetch a cached result
+
+        :param cache_key: result cache key
+        :return: serialized result or None if not cached
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            data = self._read(f"result:{cache_key}")
+            return data.decode("utf-8") if data else None
+        except Exception as e:
+            print(f"❌ Failed to fetch the cached result: {e}")
+            raise
+
+    def put_cached_result(self, cache_key, results, ttl = 86400, max_entries = 1000):
+        """
+        Store a result in the cache, evicting the least recently used
+        entries beyond max_entries
+
+        :param cache_key: result cache key
+        :param results: serialized results
+        :param ttl: Time to Live
+        :param max_entries: maximum number of cached results
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            self._write(f"result:{cache_key}", results, ttl)
+            pipe = self.client.pipeline()
+            pipe.zadd("result_cache:lru", {cache_key: time.time()})
+            pipe.zcard("result_cache:lru")
+            _, size = pipe.execute()
+
+            if size > max_entries:
+                evicted = self.client.zpopmin("result_cache:lru", size - max_entries)
+                for key, _ in evicted:
+                    self._delete(f"result:{key.decode('utf-8')}")
+                if evicted:
+                    print(f"🗑️ Evicted {len(evicted)} cached result(s)")
+            print(f"✅ Cached result {cache_key[:12]}")
+        except Exception as e:
+            print(f"❌ Failed to cache the result: {e}")
+            raise
+
+    def claim_inflight(self, fingerprint, job_id, ttl = 1200, expected_owner = None):
+        """
+        Claim a submission fingerprint for a job, so that identical
+        submissions attach to it while it is in flight
+
+        :param fingerprint: hash of the submission (or of its idempotency key)
+        :param job_id: ID of the job claiming the submission
+        :param ttl: Time to Live of the claim
+        :param expected_owner: take over the claim, only if it is still owned by this job
+        :return: (ID of the job owning the submission, True if claimed by job_id)
+        :raises: Exception if Redis operation fails
+        """
+
+        inflight_key = f"inflight:{fingerprint}"
+
+        try:
+            if self.client.set(inflight_key, job_id, ex = ttl, nx = True):
+                return job_id, True
+
+            # compare-and-set: another submission may take over the same
+            # finished owner concurrently, only one of them wins
+            with self.client.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(inflight_key)
+                        owner = pipe.get(inflight_key)
+                        owner = owner.decode("utf-8") if owner is not None else None
+                        # a missing claim expired in between, take it
+                        if owner is not None and owner != expected_owner:
+                            pipe.unwatch()
+                            return owner, False
+                        pipe.multi()
+                        pipe.set(inflight_key, job_id, ex = ttl)
+                        pipe.execute()
+                        return job_id, True
+                    except redis.WatchError:
+                        # changed meanwhile, compare against the new owner
+                        continue
+        except Exception as e:
+            print(f"❌ Failed to claim submission: {e}")
+            raise
+
+    def get_inflight_ttl(self, fingerprint):
+        """
+        Remaining Time to Live of a submission claim
+
+        :param fingerprint: hash of the submission
+        :return: seconds left, or None if the submission is not claimed
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            ttl = self.client.ttl(f"inflight:{fingerprint}")
+            return ttl if ttl >= 0 else None
+        except Exception as e:
+            print(f"❌ Failed to read submission claim: {e}")
+            raise
+
+    def release_inflight(self, fingerprint, job_id):
+        """
+        Release a submission claim, only if it is still owned by job_id
+
+        :param fingerprint: hash of the submission
+        :param job_id: ID of the job owning the claim
+        :raises: Exception if Redis operation fails
+        """
+
+        inflight_key = f"inflight:{fingerprint}"
+
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(inflight_key)
+                owner = pipe.get(inflight_key)
+                if owner is not None and owner.decode("utf-8") == job_id:
+                    pipe.multi()
+                    pipe.delete(inflight_key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except redis.WatchError:
+            # claim changed hands meanwhile, leave it to the new owner
+            pass
+        except Exception as e:
+            print(f"❌ Failed to release submission: {e}")
+            raise
+
+    def get_checkpoint(self, job_id):
+        """
+        Fetch the shot-chunk checkpoint of a job
+
+        :param job_id: ID of the job
+        :return: checkpoint (chunk layout and seed) or None if not found
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            data = self._read(f"checkpoint:{job_id}")
+            return json.loads(data.decode("utf-8")) if data else None
+        except Exception as e:
+            print(f"❌ Failed to fetch the checkpoint: {e}")
+            raise
+
+    def put_checkpoint(self, job_id, checkpoint, ttl = 3600):
+        """
+        Store the shot-chunk checkpoint of a job
+
+        :param job_id: ID of the job
+        :param checkpoint: JSON-serializable chunk layout and seed
+        :param ttl: Time to Live
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            self._write(f"checkpoint:{job_id}", json.dumps(checkpoint), ttl)
+        except Exception as e:
+            print(f"❌ Failed to store the checkpoint: {e}")
+            raise
+
+    def get_checkpoint_chunk(self, job_id, index):
+        """
+        Fetch the result of a completed shot chunk
+
+        :param job_id: ID of the job
+        :param index: index of the chunk
+        :return: serialized chunk result or None if not completed
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            data = self._read(f"checkpoint:{job_id}:{index}")
+            return data.decode("utf-8") if data else None
+        except Exception as e:
+            print(f"❌ Failed to fetch checkpoint chunk {index}: {e}")
+            raise
+
+    def put_checkpoint_chunk(self, job_id, index, results, ttl = 3600, circuit_hash = None):
+        """
+        Store the result of a completed shot chunk. The job record and its
+        circuit are kept alive as long as the checkpoint, a resumed pod needs them.
+
+        :param job_id: ID of the job
+        :param index: index of the chunk
+        :param results: serialized chunk result
+        :param ttl: Time to Live
+        :param circuit_hash: content hash of the circuit of the job
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            self._write(f"checkpoint:{job_id}:{index}", results, ttl)
+            self._extend_ttl(f"job:{job_id}", ttl)
+            if circuit_hash:
+                self._extend_ttl(f"circuit:{circuit_hash}", ttl)
+        except Exception as e:
+            print(f"❌ Failed to store checkpoint chunk {index}: {e}")
+            raise
+
+    def delete_checkpoint(self, job_id, num_chunks):
+        """
+        Delete the checkpoint of a job and its chunk results
+
+        :param job_id: ID of the job
+        :param num_chunks: number of chunks of the checkpoint
+        :raises: Exception if Redis operation fails
+        """
+
+        try:
+            for index in range(num_chunks):
+                self._delete(f"checkpoint:{job_id}:{index}")
+            self._delete(f"checkpoint:{job_id}")
+        except Exception as e:
+            print(f"❌ Failed to delete the checkpoint: {e}")
+            raise
+
     def list_all_jobs(self):
         """
         List all job IDs currently in Redis
@@ -0,0 +1,153 @@
+import math
+import os
+
+# memory of the simulator process itself (python, qiskit, aer), before any state
+BASE_MEMORY_MIB = int(os.getenv("SIMULATOR_BASE_MEMORY_MIB", "384"))
+# largest pod the cluster can schedule, jobs needing more are rejected
+MAX_MEMORY_MIB = int(os.getenv("SIMULATOR_MAX_MEMORY_MIB", "16384"))
+MAX_CPU = int(os.getenv("SIMULATOR_MAX_CPU", "8"))
+# headroom of the memory limit over the estimate
+MEMORY_HEADROOM = float(os.getenv("SIMULATOR_MEMORY_HEADROOM", "1.25"))
+
+# aer parallelizes the state update of circuits at or above this width
+PARALLEL_STATE_QUBITS = 14
+
+# bytes of one complex amplitude
+AMPLITUDE_BYTES = {"double": 16, "single": 8}
+
+CLIFFORD_GATES = {
+    "id", "x", "y", "z", "h", "s", "sdg", "sx", "sxdg", "cx", "cy", "cz",
+    "swap", "ecr", "iswap", "measure", "barrier", "delay", "reset"
+}
+
+IGNORED_INSTRUCTIONS = {"barrier", "delay"}
+
+
+class ResourceError(ValueError):
+    """
+    Raised when a job can never fit in a simulator pod
+    """
+
+
+def active_qubits(circuit):
+    """
+    Number of qubits touched by the circuit. Idle qubits of wide ISA circuits
+    are truncated by Aer and take no memory.
+    """
+    qubits = set()
+    for instruction in circuit.data:
+        if instruction.operation.name not in IGNORED_INSTRUCTIONS:
+            qubits.update(instruction.qubits)
+    return len(qubits)
+
+
+def simulation_method(circuits, method = "automatic"):
+    """
+    Method Aer picks for the circuits (clifford circuits run on the stabilizer method)
+    """
+    if method != "automatic":
+        return method
+    for circuit in circuits:
+        if any(instruction.operation.name not in CLIFFORD_GATES for instruction in circuit.data):
+            return "statevector"
+    return "stabilizer"
+
+
+def state_memory_bytes(num_qubits, method, precision = "double"):
+    """
+    Memory of the simulator state, None when it cannot be bounded from the width alone
+
+    :param num_qubits: active qubits
+    :param method: Aer simulation method
+    :param precision: "double" or "single"
+    """
+    amplitude = AMPLITUDE_BYTES.get(precision, 16)
+    if method == "statevector":
+        return amplitude * 2 ** num_qubits
+    if method in ("density_matrix", "unitary", "superop"):
+        return amplitude * 4 ** num_qubits
+    if method == "stabilizer":
+        return num_qubits * num_qubits
+    # matrix_product_state, extended_stabilizer, tensor_network
+    return None
+
+
+def estimate_resources(circuits, shots, simulator_options = None, noisy = False, bindings = 1):
+    """
+    Pre-flight estimate of the memory and CPU a simulator pod needs for the job
+
+    :param circuits: ISA circuits of the job
+    :param shots: Number of shots
+    :param simulator_options: AerSimulator options (method, precision)
+    :param noisy: the job runs with a backend noise model
+    :param bindings: number of parameter bindings (sweeps)
+    :return: dict with "resources" (spec.resources of the CR), "simulator_options"
+        (thread and memory settings for Aer) and the estimate
+    :raises ResourceError: the job needs more than SIMULATOR_MAX_MEMORY_MIB
+    """
+    simulator_options = simulator_options or {}
+    precision = simulator_options.get("precision", "double")
+    method = simulation_method(circuits, simulator_options.get("method", "automatic"))
+    num_qubits = max((active_qubits(circuit) for circuit in circuits), default=0)
+    num_clbits = max((circuit.num_clbits for circuit in circuits), default=0)
+
+    state_bytes = state_memory_bytes(num_qubits, method, precision) or 0
+    # bit arrays of the samples, then their JSON / base64 copies
+    result_bytes = 4 * shots * math.ceil(num_clbits / 8) * len(circuits) * max(bindings, 1)
+
+    # large states: threads update one state; small noisy jobs: threads run shots in parallel
+    if num_qubits >= PARALLEL_STATE_QUBITS:
+        threads = min(MAX_CPU, 2 ** ((num_qubits - PARALLEL_STATE_QUBITS) // 2 + 1))
+    elif noisy:
+        threads = min(MAX_CPU, max(1, math.ceil(shots / 1000)))
+    else:
+        threads = 1
+    if noisy and num_qubits < PARALLEL_STATE_QUBITS:
+        state_bytes *= threads
+
+    request_mib = BASE_MEMORY_MIB + math.ceil((state_bytes + result_bytes) / 2 ** 20)
+    limit_mib = math.ceil(request_mib * MEMORY_HEADROOM)
+
+    estimate = {
+        "num_qubits": num_qubits,
+        "method": method,
+        "precision": precision,
+        "state_mib": round(state_bytes / 2 ** 20, 3),
+        "memory_mib": request_mib,
+        "threads": threads
+    }
+    if limit_mib > MAX_MEMORY_MIB:
+        raise ResourceError(
+            f"Job needs ~{limit_mib / 1024:.1f}Gi for a {num_qubits}-qubit {method} ({precision}) "
+            f"simulation, above the {MAX_MEMORY_MIB / 1024:.1f}Gi limit of simulator pods. "
+            f"Use fewer qubits, or run with simulation_precision='single' or "
+            f"method='matrix_product_state'."
+        )
+
+    return {
+        "resources": {
+            "requests": {"cpu": str(threads), "memory": f"{request_mib}Mi"},
+            "limits": {"cpu": str(threads), "memory": f"{limit_mib}Mi"}
+        },
+        "simulator_options": {
+            "max_parallel_threads": threads,
+            # aer bounds its parallel shots / experiments to the pod limit
+            "max_memory_mb": limit_mib - BASE_MEMORY_MIB
+        },
+        "estimate": estimate
+    }
+
+
+def merge_resources(estimate, resources = None):
+    """
+    Resources passed by the client over the estimate, per value: a client
+    setting only a memory request keeps the estimated CPU and limits
+
+    :param estimate: "resources" of estimate_resources
+    :param resources: spec.resources passed by the client (may be partial)
+    """
+    resources = resources or {}
+    return {
+        kind: {**estimate.get(kind, {}), **(resources.get(kind) or {})}
+        for kind in ("requests", "limits")
+    }
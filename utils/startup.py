@@ -0,0 +1,168 @@
+"""
+Cold-start profiling of the services
+
+With STARTUP_PROFILE=1 every module imported after this one is timed (self
+and cumulative import time, like ``python -X importtime``) and the service init
+steps are timed with ``profiler.step``. Import this module before any heavy
+import so that they are seen.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0").lower() in ("1", "true", "yes")
+
+
+class _ImportTimer(MetaPathFinder):
+    """
+    Meta path finder timing the execution of every module it sees being loaded.
+    It never loads anything itself, it only wraps the loader found by the
+    other finders.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target = None):
+        # the other finders are asked directly, guard against re-entry
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        loader = spec.loader
+        # builtin and frozen importers are classes shared by every module
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            with self.profiler.timing_import(fullname):
+                exec_module(module)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+
+class StartupProfiler:
+    """
+    Records import time per module and wall time per init step
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = {}
+        self.steps = {}
+        self._local = threading.local()
+        self._finder = None
+
+    def install(self):
+        """
+        Start timing imports
+        """
+        if self._finder is None:
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        """
+        Stop timing imports
+        """
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    @contextmanager
+    def timing_import(self, module_name):
+        # per thread stack of [name, start, time spent importing nested modules]
+        stack = self._local.__dict__.setdefault("stack", [])
+        frame = [module_name, time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            cumulative = time.perf_counter() - frame[1]
+            if stack:
+                stack[-1][2] += cumulative
+            self.imports[module_name] = {
+                "self_s": round(cumulative - frame[2], 6),
+                "cumulative_s": round(cumulative, 6),
+                "top_level": not stack
+            }
+
+    @contextmanager
+    def step(self, name):
+        """
+        Time an init step of the service (only recorded when profiling)
+
+        :param name: Name of the step
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if STARTUP_PROFILE:
+                self.steps[name] = round(time.perf_counter() - start, 6)
+
+    def report(self, top = 20):
+        """
+        Startup profile: slowest top-level imports and packages, and the init steps
+
+        :param top: number of modules listed
+        """
+        top_level = {name: stats for name, stats in self.imports.items() if stats["top_level"]}
+        # time per root package, summed over the modules of the package
+        packages = {}
+        for name, stats in self.imports.items():
+            root = name.split(".")[0]
+            packages[root] = packages.get(root, 0.0) + stats["self_s"]
+
+        def slowest(items, key):
+            return dict(sorted(items, key=key, reverse=True)[:top])
+
+        return {
+            "since_profiler_s": round(time.perf_counter() - self.start, 6),
+            "import_s": round(sum(stats["cumulative_s"] for stats in top_level.values()), 6),
+            "imports": slowest(((name, stats["cumulative_s"]) for name, stats in top_level.items()),
+                               key=lambda item: item[1]),
+            "packages": {name: round(seconds, 6) for name, seconds in
+                         slowest(packages.items(), key=lambda item: item[1]).items()},
+            "steps": dict(self.steps)
+        }
+
+    def print_report(self, service_name, top = 20):
+        """
+        Print the startup profile as one JSON line (no-op unless profiling)
+
+        :param service_name: name of the service
+        :param top: number of modules listed
+        """
+        if not STARTUP_PROFILE:
+            return None
+        report = self.report(top)
+        print(f"🚀 Startup profile of {service_name}: {json.dumps(report)}")
+        return report
+
+
+profiler = StartupProfiler()
+if STARTUP_PROFILE:
+    profiler.install()
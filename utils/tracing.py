@@ -0,0 +1,141 @@
+import os
+from contextlib import contextmanager
+
+from opentelemetry import trace, context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+# W3C trace context ("traceparent") propagation, used for HTTP headers,
+# the CR spec / simulator pod env and the job record in redis.
+_propagator = TraceContextTextMapPropagator()
+_tracer = None
+
+
+def init_tracing(service_name):
+    """
+    Configure the tracer provider of this process
+
+        - OTEL_EXPORTER_OTLP_ENDPOINT : export spans over OTLP/HTTP
+        - TRACE_FILE : append spans as JSON lines to a local file
+
+    Without either, spans are still created so that the trace context
+    propagates, but they are not exported.
+
+    :param service_name: Name of the component emitting the spans.
+    """
+    global _tracer
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        # imported lazily, the exporter is only needed when configured
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        print(f"🔭 Exporting traces to {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')}")
+
+    trace_file = os.getenv("TRACE_FILE")
+    if trace_file:
+        exporter = ConsoleSpanExporter(
+            out=open(trace_file, "a"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        print(f"🔭 Writing traces to {trace_file}")
+
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(service_name)
+    return _tracer
+
+
+def get_tracer():
+    """
+    Return the tracer of this process (a no-op tracer before init_tracing)
+    """
+    return _tracer or trace.get_tracer(__name__)
+
+
+def shutdown_tracing():
+    """
+    Flush pending spans, needed by short lived processes before exiting
+    """
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def current_traceparent():
+    """
+    Return the W3C traceparent of the active span (or None)
+    """
+    carrier = {}
+    _propagator.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def inject_headers(headers = None):
+    """
+    Add the trace context of the active span to HTTP headers
+
+    :param headers: dict of headers to update
+    """
+    headers = {} if headers is None else headers
+    _propagator.inject(headers)
+    return headers
+
+
+def context_from_traceparent(traceparent):
+    """
+    Build a parent context from a W3C traceparent string
+
+    :param traceparent: traceparent string or None
+    """
+    if not traceparent:
+        return None
+    return _propagator.extract({"traceparent": traceparent})
+
+
+@contextmanager
+def span(name, traceparent = None, carrier = None, job_id = None, **attributes):
+    """
+    Start a span, child of the active span or of a propagated context
+
+    :param name: Name of the span
+    :param traceparent: W3C traceparent of the parent (e.g. from the CR or redis)
+    :param carrier: dict of incoming headers carrying the parent context
+    :param job_id: ID of the job, set as the `job.id` attribute
+    :param attributes: additional span attributes
+    """
+    parent = None
+    if carrier is not None:
+        parent = _propagator.extract(carrier)
+    elif traceparent:
+        parent = context_from_traceparent(traceparent)
+
+    if job_id:
+        attributes["job.id"] = job_id
+
+    with get_tracer().start_as_current_span(name, context=parent, attributes=attributes) as current:
+        yield current
+
+
+def record_span(name, start, end, traceparent = None, job_id = None, **attributes):
+    """
+    Record an already finished interval as a span, e.g. the operator
+    reconcile gap or the pod scheduling delay reconstructed from timestamps.
+
+    :param name: Name of the span
+    :param start: start time (seconds since epoch)
+    :param end: end time (seconds since epoch)
+    :param traceparent: W3C traceparent of the parent
+    :param job_id: ID of the job, set as the `job.id` attribute
+    """
+    if start is None or end is None or end < start:
+        return
+    if job_id:
+        attributes["job.id"] = job_id
+    parent = context_from_traceparent(traceparent) or context.get_current()
+    recorded = get_tracer().start_span(
+        name, context=parent, attributes=attributes, start_time=int(start * 1e9)
+    )
+    recorded.end(end_time=int(end * 1e9))
@@ -1,14 +1,33 @@
 import sys 
 import os
+import argparse
+import json
+import shutil
+import socket
+import tempfile
+import time
 
 # set default environment variable
 os.environ.setdefault("SIMULATOR_SERVICE_URL", "http://aer-simulator-service:5001")
 os.environ.setdefault('TRANSPILER_SERVICE_URL', 'http://transpiler-service:5002')
 
+# daemon mode settings
+WORKER_SOCKET = os.getenv("WORKER_SOCKET", "/tmp/qiskit-worker.sock")
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_SCRIPT_TIMEOUT = float(os.getenv("WORKER_SCRIPT_TIMEOUT", "600"))
+# memory a script may allocate on top of the warm template process
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "768"))
+
+# imported once by the fork server, every script starts from the warm copy
+PRELOAD_MODULES = ["qiskit", "qiskit_aer", "qiskit_ibm_runtime", "remote_aer_backend", "utils.tracing"]
+
 # function to execute the code
 def execute(code_string):
     "Execute user-provided Qiskit code"
 
+    from utils.tracing import init_tracing, shutdown_tracing
+    init_tracing("qiskit-worker")
+
     try:
         from remote_aer_backend import RemoteAerBackend
 
@@ -37,6 +56,7 @@ def execute(code_string):
         print("=" * 60)
         print("EXECUTION COMPLETED SUCCESSFULLY")
         print("=" * 60)
+        shutdown_tracing()
 
     except Exception as e:
 
@@ -47,22 +67,190 @@ def execute(code_string):
         print("=" * 60)
         print(f"Error: {e}")
         print(traceback.format_exc())
+        shutdown_tracing()
         sys.exit(1)
     
 
+##============= DAEMON MODE ==============
+
+def _data_segment_bytes():
+    """
+    Current data segment size (VmData) of this process
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmData:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def run_script(code_string, stdout_path, stderr_path, memory_mb):
+    """
+    Entry point of a forked script process: limit its memory, redirect its
+    output to files and execute the script
+
+    :param code_string: user code
+    :param stdout_path: file capturing stdout
+    :param stderr_path: file capturing stderr
+    :param memory_mb: memory the script may allocate on top of the template
+    """
+    import resource
+
+    # file descriptors are redirected, output of C extensions is captured too
+    for fd, path in ((1, stdout_path), (2, stderr_path)):
+        out = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        os.dup2(out, fd)
+        os.close(out)
+
+    if memory_mb > 0:
+        limit = _data_segment_bytes() + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+    execute(code_string)
+
+def handle_request(ctx, conn, timeout, memory_mb):
+    """
+    Run one submitted script in a child of the fork server and reply with its outcome
+
+    :param ctx: forkserver multiprocessing context
+    :param conn: client socket
+    :param timeout: default per-script timeout (seconds)
+    :param memory_mb: per-script memory limit (MiB)
+    """
+    workdir = tempfile.mkdtemp(prefix="qiskit-worker-")
+    try:
+        with conn, conn.makefile("rb") as reader:
+            request = json.loads(reader.readline())
+            timeout = request.get("timeout") or timeout
+            stdout_path = os.path.join(workdir, "stdout")
+            stderr_path = os.path.join(workdir, "stderr")
+
+            start = time.perf_counter()
+            process = ctx.Process(target=run_script,
+                                  args=(request["code"], stdout_path, stderr_path, memory_mb),
+                                  daemon=True)
+            process.start()
+            process.join(timeout)
+
+            timed_out = process.is_alive()
+            if timed_out:
+                process.kill()
+                process.join()
+
+            def read(path):
+                if not os.path.exists(path):
+                    return ""
+                with open(path, errors="replace") as f:
+                    return f.read()
+
+            response = {
+                "exit_code": process.exitcode,
+                "timed_out": timed_out,
+                "seconds": round(time.perf_counter() - start, 6),
+                "stdout": read(stdout_path),
+                "stderr": read(stderr_path)
+            }
+            if timed_out:
+                response["stderr"] += f"\nScript killed after {timeout}s timeout\n"
+            print(f"📜 {request.get('name', 'script')}: exit code {process.exitcode} "
+                  f"in {response['seconds']}s{' (timed out)' if timed_out else ''}")
+            conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+    except Exception as e:
+        print(f"❌ Failed to run submitted script: {e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def serve(socket_path = WORKER_SOCKET, concurrency = WORKER_CONCURRENCY,
+          timeout = WORKER_SCRIPT_TIMEOUT, memory_mb = WORKER_MEMORY_MB):
+    """
+    Worker daemon: a fork server imports qiskit, qiskit_aer and
+    remote_aer_backend once, every submitted script runs in a child forked
+    from it. At most `concurrency` scripts run at once.
+
+    :param socket_path: unix socket the daemon listens on
+    :param concurrency: maximum number of scripts running concurrently
+    :param timeout: default per-script timeout (seconds)
+    :param memory_mb: per-script memory limit (MiB), 0 disables it
+    """
+    import multiprocessing
+    from concurrent.futures import ThreadPoolExecutor
+
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(PRELOAD_MODULES)
+
+    # start the fork server now, not on the first submission
+    warmup = ctx.Process(target=time.sleep, args=(0,))
+    start = time.perf_counter()
+    warmup.start()
+    warmup.join()
+    print(f"🔥 Fork server warm in {time.perf_counter() - start:.2f}s")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    print(f"🚀 Worker daemon listening on {socket_path} (concurrency {concurrency})")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            conn, _ = server.accept()
+            pool.submit(handle_request, ctx, conn, timeout, memory_mb)
+
+def submit(code_file, socket_path = WORKER_SOCKET, timeout = None):
+    """
+    Submit a script to the worker daemon, print its output and return its exit code
+
+    :param code_file: path of the user script
+    :param socket_path: unix socket of the daemon
+    :param timeout: per-script timeout (seconds), daemon default if None
+    """
+    with open(code_file, 'r') as f:
+        request = {"name": os.path.basename(code_file), "code": f.read(), "timeout": timeout}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            response = json.loads(reader.readline())
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    exit_code = response["exit_code"]
+    return exit_code if exit_code is not None else 1
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description="Run user Qiskit scripts")
+    parser.add_argument("code_file", nargs="?", help="script to run in this process")
+    parser.add_argument("--daemon", action="store_true", help="run the pre-warmed worker daemon")
+    parser.add_argument("--submit", metavar="CODE_FILE", help="run a script on the worker daemon")
+    parser.add_argument("--socket", default=WORKER_SOCKET, help="unix socket of the daemon")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=None, help="per-script timeout (s)")
+    parser.add_argument("--memory-mb", type=int, default=WORKER_MEMORY_MB,
+                        help="per-script memory limit (MiB), 0 disables it")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
 
-    if len(sys.argv) < 2:
+    args = parse_args()
+
+    if args.daemon:
+        serve(args.socket, args.concurrency, args.timeout or WORKER_SCRIPT_TIMEOUT, args.memory_mb)
+
+    code_file = args.submit or args.code_file
+    if not code_file:
         print("Submit both worker code and codefile")
         sys.exit(1)
 
-    code_file = sys.argv[1]
-
     if not os.path.exists(code_file):
         print(f"Error: File '{code_file}' not found")
         sys.exit(1)
 
+    if args.submit:
+        sys.exit(submit(code_file, args.socket, args.timeout))
+
     with open(code_file, 'r') as f:
         code_string = f.read()
-    
+
     execute(code_string)